@@ -0,0 +1,112 @@
+"""
+Стоимость разбора одного события: по сообщению через модели pydantic против пакетного BatchDecoder.
+
+Запуск из каталога сервиса:
+    python -m benchmarks.decode
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from schemas.events import (MOVIE_DETAILS_DECODER, MOVIE_FILTERS_DECODER, MOVIE_PROGRESS_DECODER, BatchDecoder,
+                            MovieDetailsEvent, MovieFiltersEvent, MovieProgressEvent)
+
+MESSAGES = 1000
+REPEATS = 20
+
+START_DATE = datetime(2024, 1, 1)
+
+
+def format_date(seconds: int) -> str:
+    return (START_DATE + timedelta(seconds=seconds)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def make_progress_messages(count: int) -> list:
+    return [
+        json.dumps({
+            "user_id": str(uuid.uuid4()),
+            "movie_id": str(uuid.uuid4()),
+            "progress": random.uniform(0, 100),
+            "status": random.choice(["in_progress", "completed"]),
+            "last_watched": format_date(i),
+        }).encode()
+        for i in range(count)
+    ]
+
+
+def make_filters_messages(count: int) -> list:
+    return [
+        json.dumps({
+            "user_id": str(uuid.uuid4()),
+            "query": random.choice(["star", "war", "matrix", "comedy"]),
+            "page": random.randint(1, 10),
+            "size": 50,
+            "date_event": format_date(i),
+        }).encode()
+        for i in range(count)
+    ]
+
+
+def make_details_messages(count: int) -> list:
+    people = [{"uuid": str(uuid.uuid4()), "full_name": f"Person {i}"} for i in range(5)]
+    return [
+        json.dumps({
+            "user_id": str(uuid.uuid4()),
+            "uuid": str(uuid.uuid4()),
+            "title": "Star Wars",
+            "imdb_rating": 8.6,
+            "description": "A long time ago in a galaxy far, far away...",
+            "genres": [{"uuid": str(uuid.uuid4()), "name": "Drama"}],
+            "actors": people,
+            "writers": people[:2],
+            "directors": people[:1],
+            "date_event": format_date(i),
+        }).encode()
+        for i in range(count)
+    ]
+
+
+def decode_per_message(model, messages: list) -> list:
+    rows = [model.model_validate_json(message.decode("utf-8")).as_tuple() for message in messages]
+    return [list(column) for column in zip(*rows)]
+
+
+def decode_batch(decoder: BatchDecoder, messages: list) -> list:
+    return decoder.decode(messages)
+
+
+def measure(decode, target, messages: list) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start_time = time.perf_counter()
+        decode(target, messages)
+        best = min(best, time.perf_counter() - start_time)
+    return best / len(messages) * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=MESSAGES, help="Размер пачки getmany")
+    args = parser.parse_args()
+
+    topics = (
+        ("movie_progress", MovieProgressEvent, MOVIE_PROGRESS_DECODER, make_progress_messages),
+        ("movie_filters", MovieFiltersEvent, MOVIE_FILTERS_DECODER, make_filters_messages),
+        ("movie_details", MovieDetailsEvent, MOVIE_DETAILS_DECODER, make_details_messages),
+    )
+    for name, model, decoder, make_messages in topics:
+        messages = make_messages(args.messages)
+        assert decode_per_message(model, messages) == decode_batch(decoder, messages)
+
+        before = measure(decode_per_message, model, messages)
+        after = measure(decode_batch, decoder, messages)
+        print(f"{name} ({len(messages)} messages per batch)")
+        print(f"  Per-message models: {before:>8.2f} us/event")
+        print(f"  BatchDecoder:       {after:>8.2f} us/event (x{before / after:.1f})")
+
+
+if __name__ == "__main__":
+    main()
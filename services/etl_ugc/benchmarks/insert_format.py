@@ -0,0 +1,147 @@
+"""
+Сравнение пропускной способности вставки VALUES и Native для таблиц UGC.
+
+Запуск из каталога сервиса:
+    python -m benchmarks.insert_format
+    python -m benchmarks.insert_format --clickhouse-url http://localhost:8123
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from aiochclient import ChClient
+from aiochclient.types import rows2ch
+from aiohttp import ClientSession
+from schemas.events import MovieDetailsEvent, MovieFiltersEvent, MovieProgressEvent
+from utils.native import encode_block
+from utils.sql_queries import MOVIE_DETAILS_QUERY, MOVIE_FILTERS_QUERY, MOVIE_METADATA_QUERY, MOVIE_PROGRESS_QUERY
+
+ROWS = 50_000
+REPEATS = 5
+
+START_DATE = datetime(2024, 1, 1)
+
+
+def make_progress_rows(count: int) -> list:
+    return [
+        MovieProgressEvent(
+            user_id=str(uuid.uuid4()),
+            movie_id=str(uuid.uuid4()),
+            progress=random.uniform(0, 100),
+            status=random.choice(["in_progress", "completed"]),
+            last_watched=START_DATE + timedelta(seconds=i),
+        ).as_tuple()
+        for i in range(count)
+    ]
+
+
+def make_filters_rows(count: int) -> list:
+    return [
+        MovieFiltersEvent(
+            user_id=str(uuid.uuid4()),
+            query=random.choice(["star", "war", "matrix", "comedy"]),
+            page=random.randint(1, 10),
+            size=50,
+            date_event=START_DATE + timedelta(seconds=i),
+        ).as_tuple()
+        for i in range(count)
+    ]
+
+
+def make_details_events(count: int) -> list:
+    people = [{"uuid": str(uuid.uuid4()), "full_name": f"Person {i}"} for i in range(5)]
+    genres = [{"uuid": str(uuid.uuid4()), "name": "Drama"}]
+    return [
+        MovieDetailsEvent(
+            user_id=str(uuid.uuid4()),
+            uuid=str(uuid.uuid4()),
+            title="Star Wars",
+            imdb_rating=8.6,
+            description="A long time ago in a galaxy far, far away... " * 4,
+            genres=genres,
+            actors=people,
+            writers=people[:2],
+            directors=people[:1],
+            date_event=START_DATE + timedelta(seconds=i),
+        ).as_tuple()
+        for i in range(count)
+    ]
+
+
+def make_details_rows(count: int) -> list:
+    return [(event[0], event[1], event[-1]) for event in make_details_events(count)]
+
+
+def make_metadata_rows(count: int) -> list:
+    return [event[1:] for event in make_details_events(count)]
+
+
+def encode_values(table_query: dict, rows: list) -> bytes:
+    return rows2ch(*rows)
+
+
+def encode_native(table_query: dict, rows: list) -> bytes:
+    columns = [list(column) for column in zip(*rows)]
+    return encode_block(table_query["columns"], columns)
+
+
+def measure(encoder, table_query: dict, rows: list) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start_time = time.perf_counter()
+        encoder(table_query, rows)
+        best = min(best, time.perf_counter() - start_time)
+    return len(rows) / best
+
+
+async def measure_clickhouse(url: str, table_query: dict, rows: list) -> None:
+    # Адаптер тянет настройки сервиса, а они нужны только для замера на живом ClickHouse.
+    from db.clickhouse import ClickHouseAdapter
+
+    async with ClientSession() as session:
+        client = ChClient(session, url=url)
+        await ClickHouseAdapter(client, session).init()
+
+        start_time = time.perf_counter()
+        await client.execute(table_query["insert_data"], *rows)
+        values_elapsed = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        body = encode_native(table_query, rows)
+        params = {**client.params, "query": table_query["insert_native"].strip()}
+        async with session.post(url, params=params, headers=client.headers, data=body) as response:
+            response.raise_for_status()
+        native_elapsed = time.perf_counter() - start_time
+
+    print(f"  ClickHouse VALUES: {len(rows) / values_elapsed:>12,.0f} rows/sec")
+    print(f"  ClickHouse Native: {len(rows) / native_elapsed:>12,.0f} rows/sec")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=ROWS)
+    parser.add_argument("--clickhouse-url", default=None, help="Дополнительно замерить вставку в живой ClickHouse")
+    args = parser.parse_args()
+
+    tables = (
+        ("movie_progress", MOVIE_PROGRESS_QUERY, make_progress_rows),
+        ("movie_filters", MOVIE_FILTERS_QUERY, make_filters_rows),
+        ("movie_details", MOVIE_DETAILS_QUERY, make_details_rows),
+        ("movie_metadata", MOVIE_METADATA_QUERY, make_metadata_rows),
+    )
+    for name, table_query, make_rows in tables:
+        rows = make_rows(args.rows)
+        values_rate = measure(encode_values, table_query, rows)
+        native_rate = measure(encode_native, table_query, rows)
+        print(f"{name} ({len(rows)} rows)")
+        print(f"  Encode VALUES:     {values_rate:>12,.0f} rows/sec")
+        print(f"  Encode Native:     {native_rate:>12,.0f} rows/sec (x{native_rate / values_rate:.1f})")
+        if args.clickhouse_url:
+            await measure_clickhouse(args.clickhouse_url, table_query, rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,296 @@
+"""
+Пропускная способность тракта Kafka -> etl_ugc -> ClickHouse под синтетической нагрузкой.
+
+Генератор выдаёт события MovieProgressEvent, MovieFiltersEvent и MovieDetailsEvent с заданной
+частотой, ETLService (или PipelinedETLService) читает и загружает их, а по завершении выводятся
+пропускная способность, задержка p50/p99 от публикации события до коммита его offset'а
+и пиковое потребление памяти.
+
+По умолчанию брокер и ClickHouse заменены реализациями в памяти процесса (brokers.memory,
+db.memory): замеряется сама логика разбора, батчинга и кодирования вставок. С `--kafka-servers`
+события публикуются в Kafka и читаются настоящим consumer'ом группы etl_ugc, с `--clickhouse-url`
+вставки идут в ClickHouse: запускать на тестовом стенде, не рядом с рабочим etl_ugc.
+
+Запуск из каталога сервиса (нужны переменные окружения сервиса, как для main.py):
+    python -m benchmarks.pipeline_throughput
+    python -m benchmarks.pipeline_throughput --events 500000 --rate 50000 --pipelined --insert-format native
+    python -m benchmarks.pipeline_throughput --kafka-servers localhost:9094 --clickhouse-url http://localhost:8123
+"""
+import argparse
+import asyncio
+import random
+import resource
+import statistics
+import time
+import uuid
+from collections import Counter, defaultdict, deque
+from datetime import datetime
+from typing import Deque, Dict, List, Tuple
+
+import orjson
+from aiohttp import ClientSession
+from aiokafka import AIOKafkaProducer, ConsumerRecord, TopicPartition
+from brokers.memory import InMemoryBroker, InMemoryConsumer
+from core.config import settings
+from db.memory import InMemoryAnalyticDatabase
+from dependencies.clickhouse import get_clickhouse_service
+from dependencies.kafka import get_kafka_consumer
+from services.dead_letter import DeadLetterQueue
+from services.etl import ETLService
+from services.pipeline import PipelinedETLService
+
+EVENTS = 200_000
+PARTITIONS = 3
+USERS = 10_000
+MOVIES = 2_000
+QUERIES = 500
+
+PROGRESS_TOPIC = "movie_progress-events"
+FILTERS_TOPIC = "movie_filters-events"
+DETAILS_TOPIC = "movie_details-events"
+TOPICS = (PROGRESS_TOPIC, FILTERS_TOPIC, DETAILS_TOPIC)
+
+# Сообщение для генератора: топик, ключ, значение.
+Message = Tuple[str, bytes, bytes]
+
+
+class EventGenerator:
+    """События трёх топиков с общими пулами пользователей, фильмов и поисковых запросов."""
+
+    def __init__(self, users: int, movies: int, mix: Tuple[float, float, float], seed: int = 0):
+        self.random = random.Random(seed)
+        self.users = [str(uuid.UUID(int=self.random.getrandbits(128))) for _ in range(users)]
+        self.movies = [self.make_movie(index) for index in range(movies)]
+        self.queries = [f"query {index}" for index in range(QUERIES)]
+        self.mix = mix
+
+    def make_movie(self, index: int) -> dict:
+        people = [
+            {"uuid": str(uuid.UUID(int=self.random.getrandbits(128))), "full_name": f"Person {index}-{number}"}
+            for number in range(8)
+        ]
+        return {
+            "uuid": str(uuid.UUID(int=self.random.getrandbits(128))),
+            "title": f"Movie {index}",
+            "imdb_rating": round(self.random.uniform(1, 10), 1),
+            "description": f"Movie {index}. " + "A long time ago in a galaxy far, far away... " * 5,
+            "genres": [{"uuid": str(uuid.UUID(int=index % 20)), "name": f"Genre {index % 20}"}],
+            "actors": people[:5],
+            "writers": people[5:7],
+            "directors": people[7:],
+        }
+
+    def make_message(self) -> Message:
+        user_id = self.random.choice(self.users)
+        movie = self.random.choice(self.movies)
+        date_event = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        topic = self.random.choices(TOPICS, weights=self.mix)[0]
+        if topic == PROGRESS_TOPIC:
+            progress = round(self.random.uniform(0, 100), 2)
+            event = {
+                "user_id": user_id,
+                "movie_id": movie["uuid"],
+                "progress": progress,
+                "status": "completed" if progress >= 95 else "in_progress",
+                "last_watched": date_event,
+            }
+        elif topic == FILTERS_TOPIC:
+            event = {
+                "user_id": user_id,
+                "query": self.random.choice(self.queries),
+                "page": self.random.randint(1, 10),
+                "size": 50,
+                "date_event": date_event,
+            }
+        else:
+            event = {**movie, "user_id": user_id, "date_event": date_event}
+        return topic, user_id.encode(), orjson.dumps(event)
+
+    def make_messages(self, count: int) -> Deque[Message]:
+        return deque(self.make_message() for _ in range(count))
+
+
+class LatencyProbe:
+    """
+    Задержка от публикации события до коммита его offset'а: после коммита событие
+    гарантированно записано в ClickHouse или в буфер на диске.
+    """
+
+    def __init__(self, started_at_ms: int):
+        self.started_at_ms = started_at_ms
+        self.fetched: Dict[TopicPartition, Deque[Tuple[int, List[int]]]] = defaultdict(deque)
+        self.latencies: List[float] = []
+        self.committed_events = 0
+        self.done = asyncio.Event()
+        self.expected_events = 0
+
+    def track_fetch(self, messages: Dict[TopicPartition, List[ConsumerRecord]]):
+        for topic_partition, messages_list in messages.items():
+            timestamps = [message.timestamp for message in messages_list if message.timestamp >= self.started_at_ms]
+            self.fetched[topic_partition].append((messages_list[-1].offset, timestamps))
+
+    def track_commit(self, offsets: Dict[TopicPartition, int]):
+        now_ms = time.time() * 1000
+        for topic_partition, offset in offsets.items():
+            fetched = self.fetched[topic_partition]
+            while fetched and fetched[0][0] < offset:
+                _, timestamps = fetched.popleft()
+                self.latencies.extend(now_ms - timestamp for timestamp in timestamps)
+                self.committed_events += len(timestamps)
+        if self.expected_events and self.committed_events >= self.expected_events:
+            self.done.set()
+
+
+def with_latency_probe(service_class):
+    class MeasuredETLService(service_class):
+        probe: LatencyProbe
+
+        async def fetch(self):
+            messages = await super().fetch()
+            self.probe.track_fetch(messages)
+            return messages
+
+        async def commit_offsets(self, offsets: Dict[TopicPartition, int]):
+            await super().commit_offsets(offsets)
+            self.probe.track_commit(offsets)
+
+    return MeasuredETLService
+
+
+async def produce(send, messages: Deque[Message], rate: int, probe: LatencyProbe):
+    """Публикация сообщений с заданной частотой в секунду; 0 - без ограничения."""
+    total = len(messages)
+    probe.expected_events = total
+    started_at = time.perf_counter()
+    produced = 0
+    while messages:
+        if rate:
+            due = min(total, int((time.perf_counter() - started_at) * rate) + 1)
+        else:
+            due = min(total, produced + 1000)
+        while produced < due:
+            await send(*messages.popleft())
+            produced += 1
+        await asyncio.sleep(0.001 if rate else 0)
+
+
+def get_peak_rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values: List[float], percent: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=EVENTS)
+    parser.add_argument("--rate", type=int, default=0, help="Событий в секунду; 0 - с максимальной скоростью")
+    parser.add_argument("--mix", default="70,20,10", help="Доли progress, filters и details событий")
+    parser.add_argument("--users", type=int, default=USERS)
+    parser.add_argument("--movies", type=int, default=MOVIES)
+    parser.add_argument("--partitions", type=int, default=PARTITIONS, help="Партиций на топик в брокере в памяти")
+    parser.add_argument("--pipelined", action="store_true", help="Запустить PipelinedETLService")
+    parser.add_argument("--insert-format", choices=("values", "native"), default=settings.etl_insert_format)
+    parser.add_argument("--batch-size", type=int, default=settings.etl_batch_size)
+    parser.add_argument(
+        "--batch-linger-seconds", type=float, default=1.0,
+        help="Последний неполный батч ждёт этот срок, он входит во время прогона"
+    )
+    parser.add_argument("--insert-latency-ms", type=float, default=5.0, help="Задержка вставки в ClickHouse в памяти")
+    parser.add_argument("--kafka-servers", default=None, help="Публиковать и читать через настоящую Kafka")
+    parser.add_argument("--clickhouse-url", default=None, help="Вставлять в настоящий ClickHouse")
+    args = parser.parse_args()
+
+    settings.etl_insert_format = args.insert_format
+    mix = tuple(float(share) for share in args.mix.split(","))
+    generator = EventGenerator(args.users, args.movies, mix)
+    messages = generator.make_messages(args.events)
+    topics_mix = Counter(topic for topic, _, _ in messages)
+    baseline_rss = get_peak_rss_mib()
+
+    async with ClientSession() as session:
+        if args.clickhouse_url:
+            clickhouse_service = await get_clickhouse_service(session, url=args.clickhouse_url)
+            await clickhouse_service.init()
+        else:
+            clickhouse_service = InMemoryAnalyticDatabase(args.insert_latency_ms / 1000)
+
+        producer = None
+        if args.kafka_servers:
+            producer = AIOKafkaProducer(bootstrap_servers=args.kafka_servers, linger_ms=5)
+            await producer.start()
+            send = producer.send
+            consumer = get_kafka_consumer(args.kafka_servers, group_id="etl_ugc")
+        else:
+            broker = InMemoryBroker(list(TOPICS), args.partitions)
+            send = broker.send
+            consumer = InMemoryConsumer(broker)
+
+        base_class = PipelinedETLService if args.pipelined else ETLService
+        service_class = with_latency_probe(base_class)
+        options = dict(queue_size=settings.etl_pipeline_queue_size) if args.pipelined else {}
+        etl_service = service_class(
+            clickhouse_service=clickhouse_service,
+            consumer=consumer,
+            kafka_topics=list(TOPICS),
+            batch_size=args.batch_size,
+            batch_max_bytes=settings.etl_batch_max_bytes,
+            batch_linger_seconds=args.batch_linger_seconds,
+            dead_letter_queue=DeadLetterQueue(
+                kafka_servers=args.kafka_servers or "",
+                topic=settings.etl_dead_letter_topic,
+                spill_path=settings.etl_dead_letter_spill_path
+            ),
+            **options
+        )
+        probe = etl_service.probe = LatencyProbe(int(time.time() * 1000))
+
+        if args.kafka_servers:
+            etl_task = asyncio.create_task(etl_service.consume_kafka())
+        else:
+            # Без Kafka dead-letter очередь не запускается: генератор не выдаёт некорректных событий.
+            consumer.subscribe(list(TOPICS))
+            etl_task = asyncio.create_task(etl_service.run())
+
+        started_at = time.perf_counter()
+        try:
+            await produce(send, messages, args.rate, probe)
+            if producer is not None:
+                await producer.flush()
+            produced_at = time.perf_counter()
+            await asyncio.wait([etl_task, asyncio.create_task(probe.done.wait())], return_when=asyncio.FIRST_COMPLETED)
+            elapsed = time.perf_counter() - started_at
+        finally:
+            etl_task.cancel()
+            await asyncio.gather(etl_task, return_exceptions=True)
+            if producer is not None:
+                await producer.stop()
+
+    print(
+        f"{base_class.__name__}, {args.insert_format}, batch {args.batch_size}, "
+        f"{'Kafka' if args.kafka_servers else 'in-process broker'} -> "
+        f"{'ClickHouse' if args.clickhouse_url else f'in-memory ClickHouse ({args.insert_latency_ms:g} ms/insert)'}"
+    )
+    print(f"  Events:      {args.events:,} ({', '.join(f'{topic} {count:,}' for topic, count in topics_mix.items())})")
+    print(f"  Committed:   {probe.committed_events:,} in {elapsed:.2f}s (produced in {produced_at - started_at:.2f}s)")
+    print(f"  Throughput:  {probe.committed_events / elapsed:,.0f} events/sec")
+    print(
+        f"  Latency:     p50 {percentile(probe.latencies, 50):,.0f} ms, "
+        f"p99 {percentile(probe.latencies, 99):,.0f} ms, max {max(probe.latencies, default=0):,.0f} ms"
+    )
+    peak_rss = get_peak_rss_mib()
+    print(f"  Peak RSS:    {peak_rss:,.0f} MiB (+{peak_rss - baseline_rss:,.0f} MiB during the run)")
+    if isinstance(clickhouse_service, InMemoryAnalyticDatabase):
+        for table, rows in sorted(clickhouse_service.rows.items()):
+            inserts = clickhouse_service.inserts[table]
+            print(
+                f"  {table:<24} {rows:>10,} rows, {inserts:>6,} inserts, "
+                f"{clickhouse_service.bytes[table] / 2 ** 20:>8.1f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,249 @@
+"""
+Сравнение физической раскладки таблиц UGC до и после миграции 0003_physical_layout:
+объём на диске и время типовых запросов на синтетических данных.
+
+Исходная раскладка (0001) создаётся в базе `ugc_layout_old` и заполняется синтетическими
+событиями. В базу `ugc_layout_new` те же данные копируются и переносятся запросами миграции
+0003 (без materialized view, TTL и политики хранения: на объём и скорость на горячем томе
+они не влияют, а том 'cold' есть не на каждом сервере).
+
+Запуск из каталога сервиса:
+    python -m benchmarks.table_layout --clickhouse-url http://localhost:8123
+"""
+import argparse
+import asyncio
+import os
+import re
+import time
+
+from aiochclient import ChClient
+from aiohttp import ClientSession
+
+ROWS = 1_000_000
+REPEATS = 5
+
+OLD_DATABASE = "ugc_layout_old"
+NEW_DATABASE = "ugc_layout_new"
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+EVENT_TABLES = ("movie_progress", "movie_filters", "movie_details")
+TABLES = (*EVENT_TABLES, "movie_metadata")
+
+# События распределены по году, пользователей в 20 раз меньше, чем событий.
+GENERATE_QUERIES = (
+    """
+    INSERT INTO {db}.movie_progress
+    SELECT
+        toString(reinterpretAsUUID(MD5(concat('user', toString(number % {users}))))),
+        toString(reinterpretAsUUID(MD5(concat('movie', toString(rand(1) % {movies}))))),
+        (rand(2) % 10001) / 100 AS progress,
+        if(progress >= 95, 'completed', 'in_progress'),
+        toDateTime('2024-01-01 00:00:00') + intDiv(number * 31536000, {rows})
+    FROM numbers({rows})
+    """,
+    """
+    INSERT INTO {db}.movie_filters
+    SELECT
+        toString(reinterpretAsUUID(MD5(concat('user', toString(number % {users}))))),
+        concat('query ', toString(rand(1) % 500)),
+        rand(2) % 10 + 1,
+        50,
+        toDateTime('2024-01-01 00:00:00') + intDiv(number * 31536000, {rows})
+    FROM numbers({rows})
+    """,
+    """
+    INSERT INTO {db}.movie_details
+    SELECT
+        toString(reinterpretAsUUID(MD5(concat('user', toString(number % {users}))))),
+        toString(reinterpretAsUUID(MD5(concat('movie', toString(movie))))),
+        concat('Movie ', toString(movie)),
+        (movie % 90) / 10,
+        concat('Description of movie ', toString(movie), '. ', repeat('A long time ago in a galaxy far away. ', 5)),
+        [(toString(reinterpretAsUUID(MD5(concat('genre', toString(movie % 20))))),
+          concat('Genre ', toString(movie % 20)))],
+        arrayMap(
+            i -> (toString(reinterpretAsUUID(MD5(concat('person', toString(movie * 8 + i))))),
+                  concat('Person ', toString(movie * 8 + i))),
+            range(5)
+        ),
+        arrayMap(
+            i -> (toString(reinterpretAsUUID(MD5(concat('person', toString(movie * 8 + 5 + i))))),
+                  concat('Person ', toString(movie * 8 + 5 + i))),
+            range(2)
+        ),
+        [(toString(reinterpretAsUUID(MD5(concat('person', toString(movie * 8 + 7))))),
+          concat('Person ', toString(movie * 8 + 7)))],
+        toDateTime('2024-01-01 00:00:00') + intDiv(number * 31536000, {rows})
+    FROM (SELECT number, rand(1) % {movies} AS movie FROM numbers({rows}))
+    """,
+)
+
+# Одинаковый смысл запроса для обеих раскладок: (название, старая раскладка, новая раскладка).
+QUERIES = (
+    (
+        "Progress for one month",
+        """
+        SELECT count(), avg(progress) FROM {db}.movie_progress
+        WHERE last_watched >= '2024-06-01 00:00:00' AND last_watched < '2024-07-01 00:00:00'
+        """,
+        None,
+    ),
+    (
+        "Top search queries",
+        "SELECT query, count() AS hits FROM {db}.movie_filters GROUP BY query ORDER BY hits DESC LIMIT 10",
+        None,
+    ),
+    (
+        "Views by genre",
+        """
+        SELECT genre.name, count() AS views FROM {db}.movie_details
+        ARRAY JOIN genres AS genre
+        GROUP BY genre.name ORDER BY views DESC
+        """,
+        """
+        SELECT genre.name, sum(details.views) AS views
+        FROM (SELECT uuid, count() AS views FROM {db}.movie_details GROUP BY uuid) AS details
+        INNER JOIN (SELECT uuid, genres FROM {db}.movie_metadata FINAL) AS metadata ON details.uuid = metadata.uuid
+        ARRAY JOIN metadata.genres AS genre
+        GROUP BY genre.name ORDER BY views DESC
+        """,
+    ),
+    (
+        "Titles watched by one user",
+        """
+        SELECT DISTINCT title FROM {db}.movie_details
+        WHERE user_id = toString(reinterpretAsUUID(MD5('user42')))
+        """,
+        """
+        SELECT DISTINCT title FROM {db}.movie_metadata FINAL
+        WHERE uuid IN (
+            SELECT uuid FROM {db}.movie_details WHERE user_id = toString(reinterpretAsUUID(MD5('user42')))
+        )
+        """,
+    ),
+)
+
+FOOTPRINT_QUERY = """
+    SELECT
+        database,
+        table,
+        sum(rows) AS rows,
+        sum(bytes_on_disk) AS bytes_on_disk,
+        sum(data_compressed_bytes) AS compressed,
+        sum(data_uncompressed_bytes) AS uncompressed
+    FROM system.parts
+    WHERE active AND database IN ({databases}) AND table IN ({tables})
+    GROUP BY database, table
+"""
+
+
+def load_statements(file_name: str) -> list:
+    # Загрузчик миграций тянет настройки сервиса, а бенчмарку нужен только разбор файла.
+    from db.migrations import split_statements
+
+    with open(os.path.join(MIGRATIONS_DIR, file_name), encoding="utf-8") as migration_file:
+        return split_statements(migration_file.read())
+
+
+def get_layout_statements(database: str, file_name: str) -> list:
+    """Запросы миграции для отдельной базы, без materialized view и без TTL/политики хранения."""
+    statements = []
+    for statement in load_statements(file_name):
+        if "VIEW" in statement:
+            continue
+        statement = re.sub(r"\nTTL .*? DELETE", "", statement, flags=re.DOTALL)
+        statement = re.sub(r"\nSETTINGS storage_policy = '\w+'", "", statement)
+        statements.append(statement.replace("default.", f"{database}."))
+    return statements
+
+
+async def prepare(client: ChClient, rows: int) -> None:
+    params = {"rows": rows, "users": max(1, rows // 20), "movies": 2000}
+    for database in (OLD_DATABASE, NEW_DATABASE):
+        await client.execute(f"DROP DATABASE IF EXISTS {database}")
+        await client.execute(f"CREATE DATABASE {database}")
+        for statement in get_layout_statements(database, "0001_create_event_tables.sql"):
+            await client.execute(statement)
+
+    start_time = time.perf_counter()
+    for query in GENERATE_QUERIES:
+        await client.execute(query.format(db=OLD_DATABASE, **params))
+    for table in EVENT_TABLES:
+        await client.execute(f"INSERT INTO {NEW_DATABASE}.{table} SELECT * FROM {OLD_DATABASE}.{table}")
+    print(f"Generated {rows} events per table in {time.perf_counter() - start_time:.1f}s")
+
+    start_time = time.perf_counter()
+    for statement in get_layout_statements(NEW_DATABASE, "0003_physical_layout.sql"):
+        await client.execute(statement)
+    print(f"Migrated to the new layout in {time.perf_counter() - start_time:.1f}s")
+
+    # Сравнение идёт по полностью слитым партам, как у давно отлежавшихся данных.
+    for database, tables in ((OLD_DATABASE, EVENT_TABLES), (NEW_DATABASE, TABLES)):
+        for table in tables:
+            await client.execute(f"OPTIMIZE TABLE {database}.{table} FINAL")
+
+
+async def report_footprint(client: ChClient) -> None:
+    query = FOOTPRINT_QUERY.format(
+        databases=", ".join(f"'{database}'" for database in (OLD_DATABASE, NEW_DATABASE)),
+        tables=", ".join(f"'{table}'" for table in TABLES),
+    )
+    footprint = {(row["database"], row["table"]): row for row in await client.fetch(query)}
+
+    print("\nDisk footprint (MiB on disk / compressed / uncompressed)")
+    for table in TABLES:
+        for database in (OLD_DATABASE, NEW_DATABASE):
+            row = footprint.get((database, table))
+            if row is None:
+                continue
+            print(
+                f"  {database}.{table:<16} {row['rows']:>10,} rows  "
+                f"{row['bytes_on_disk'] / 2 ** 20:>9.2f} / "
+                f"{row['compressed'] / 2 ** 20:>9.2f} / "
+                f"{row['uncompressed'] / 2 ** 20:>9.2f}"
+            )
+
+    for database in (OLD_DATABASE, NEW_DATABASE):
+        total = sum(row["bytes_on_disk"] for (row_database, _), row in footprint.items() if row_database == database)
+        print(f"  {database} total: {total / 2 ** 20:.2f} MiB")
+
+
+async def measure_query(client: ChClient, query: str) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start_time = time.perf_counter()
+        await client.fetch(query)
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+
+async def report_queries(client: ChClient) -> None:
+    print(f"\nQuery time (best of {REPEATS}, ms)")
+    for name, old_query, new_query in QUERIES:
+        old_elapsed = await measure_query(client, old_query.format(db=OLD_DATABASE))
+        new_elapsed = await measure_query(client, (new_query or old_query).format(db=NEW_DATABASE))
+        print(
+            f"  {name:<28} old {old_elapsed * 1000:>8.1f}  new {new_elapsed * 1000:>8.1f}  "
+            f"(x{old_elapsed / new_elapsed:.2f})"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=ROWS, help="Число синтетических событий в каждой таблице")
+    parser.add_argument("--clickhouse-url", default="http://localhost:8123")
+    parser.add_argument("--keep", action="store_true", help="Не удалять базы бенчмарка после замеров")
+    args = parser.parse_args()
+
+    async with ClientSession() as session:
+        client = ChClient(session, url=args.clickhouse_url)
+        await prepare(client, args.rows)
+        await report_footprint(client)
+        await report_queries(client)
+        if not args.keep:
+            for database in (OLD_DATABASE, NEW_DATABASE):
+                await client.execute(f"DROP DATABASE IF EXISTS {database}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,41 @@
+from typing import Dict, List, Optional, Set
+
+from aiokafka import AIOKafkaConsumer, ConsumerRebalanceListener, ConsumerRecord, TopicPartition
+from utils.abstract import AsyncMessageConsumer
+
+
+class KafkaConsumerAdapter(AsyncMessageConsumer):
+    def __init__(self, consumer: AIOKafkaConsumer):
+        self.consumer = consumer
+
+    def subscribe(self, topics: List[str], listener: Optional[ConsumerRebalanceListener] = None):
+        self.consumer.subscribe(topics, listener=listener)
+
+    async def start(self):
+        await self.consumer.start()
+
+    async def stop(self):
+        await self.consumer.stop()
+
+    async def getmany(
+        self, timeout_ms: int = 0, max_records: Optional[int] = None
+    ) -> Dict[TopicPartition, List[ConsumerRecord]]:
+        return await self.consumer.getmany(timeout_ms=timeout_ms, max_records=max_records)
+
+    async def commit(self, offsets: Dict[TopicPartition, int]):
+        await self.consumer.commit(offsets)
+
+    def assignment(self) -> Set[TopicPartition]:
+        return self.consumer.assignment()
+
+    def pause(self, *partitions: TopicPartition):
+        self.consumer.pause(*partitions)
+
+    def resume(self, *partitions: TopicPartition):
+        self.consumer.resume(*partitions)
+
+    def paused(self) -> Set[TopicPartition]:
+        return self.consumer.paused()
+
+    def highwater(self, topic_partition: TopicPartition) -> Optional[int]:
+        return self.consumer.highwater(topic_partition)
@@ -0,0 +1,111 @@
+import asyncio
+import time
+import zlib
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set
+
+from aiokafka import ConsumerRebalanceListener, ConsumerRecord, TopicPartition
+from utils.abstract import AsyncMessageConsumer
+
+
+class InMemoryBroker:
+    """
+    Партиции топиков в памяти процесса для профилирования и тестов ETL без Kafka.
+
+    Сообщение попадает в партицию по хэшу ключа и удаляется, как только его прочитали:
+    offset'ы и highwater ведутся так же, как в Kafka, но перечитать сообщения нельзя.
+    """
+
+    def __init__(self, topics: List[str], partitions: int):
+        self.partitions = partitions
+        self.logs: Dict[TopicPartition, Deque[ConsumerRecord]] = {
+            TopicPartition(topic, partition): deque() for topic in topics for partition in range(partitions)
+        }
+        self.highwaters: Dict[TopicPartition, int] = {topic_partition: 0 for topic_partition in self.logs}
+        self.new_messages = asyncio.Event()
+
+    async def send(self, topic: str, key: bytes, value: bytes):
+        topic_partition = TopicPartition(topic, zlib.crc32(key) % self.partitions)
+        offset = self.highwaters[topic_partition]
+        self.logs[topic_partition].append(ConsumerRecord(
+            topic, topic_partition.partition, offset, int(time.time() * 1000), 0,
+            key, value, None, len(key), len(value), []
+        ))
+        self.highwaters[topic_partition] = offset + 1
+        self.new_messages.set()
+
+    def get_partitions(self, topics: List[str]) -> Set[TopicPartition]:
+        return {topic_partition for topic_partition in self.logs if topic_partition.topic in topics}
+
+
+class InMemoryConsumer(AsyncMessageConsumer):
+    """Единственный consumer группы: за ним закреплены все партиции подписанных топиков."""
+
+    def __init__(self, broker: InMemoryBroker):
+        self.broker = broker
+        self.topics: List[str] = []
+        self.listener: Optional[ConsumerRebalanceListener] = None
+        self.paused_partitions: Set[TopicPartition] = set()
+        self.committed: Dict[TopicPartition, int] = {}
+        self.fetch_order: Deque[TopicPartition] = deque()
+
+    def subscribe(self, topics: List[str], listener: Optional[ConsumerRebalanceListener] = None):
+        self.topics = list(topics)
+        self.listener = listener
+        self.fetch_order = deque(sorted(self.assignment()))
+
+    async def start(self):
+        if self.listener is not None:
+            await self.listener.on_partitions_assigned(self.assignment())
+
+    async def stop(self):
+        pass
+
+    def assignment(self) -> Set[TopicPartition]:
+        return self.broker.get_partitions(self.topics)
+
+    def pause(self, *partitions: TopicPartition):
+        self.paused_partitions.update(partitions)
+
+    def resume(self, *partitions: TopicPartition):
+        self.paused_partitions.difference_update(partitions)
+
+    def paused(self) -> Set[TopicPartition]:
+        return set(self.paused_partitions)
+
+    def highwater(self, topic_partition: TopicPartition) -> Optional[int]:
+        return self.broker.highwaters.get(topic_partition)
+
+    async def commit(self, offsets: Dict[TopicPartition, int]):
+        self.committed.update(offsets)
+
+    async def getmany(
+        self, timeout_ms: int = 0, max_records: Optional[int] = None
+    ) -> Dict[TopicPartition, List[ConsumerRecord]]:
+        messages = self.take(max_records)
+        if not messages and timeout_ms:
+            self.broker.new_messages.clear()
+            try:
+                await asyncio.wait_for(self.broker.new_messages.wait(), timeout_ms / 1000)
+            except asyncio.TimeoutError:
+                return {}
+            messages = self.take(max_records)
+        # Как и настоящий consumer, отдаём управление циклу событий даже при готовых данных.
+        await asyncio.sleep(0)
+        return messages
+
+    def take(self, max_records: Optional[int]) -> Dict[TopicPartition, List[ConsumerRecord]]:
+        messages = {}
+        remaining = max_records or float("inf")
+        # Партиции опрашиваются по кругу, чтобы ограничение max_records не обделяло последние.
+        self.fetch_order.rotate(-1)
+        for topic_partition in self.fetch_order:
+            log = self.broker.logs[topic_partition]
+            if not log or topic_partition in self.paused_partitions:
+                continue
+            count = min(len(log), remaining)
+            messages[topic_partition] = [log.popleft() for _ in range(count)]
+            remaining -= count
+            if not remaining:
+                break
+        return messages
@@ -1,5 +1,6 @@
 import os
 from logging import config as logging_config
+from typing import Literal
 
 from core.logger import LOGGING
 from pydantic import Field
@@ -14,6 +15,7 @@ class Settings(BaseSettings):
     clickhouse_protocol: str = Field('http', alias='CLICKHOUSE_SERVICE_PROTOCOL')
     clickhouse_host: str = Field('clickhouse', alias='CLICKHOUSE_SERVICE_HOST')
     clickhouse_port: int = Field(8123, alias='CLICKHOUSE_SERVICE_PORT')
+    clickhouse_migrations_dir: str = Field(os.path.join(BASE_DIR, 'migrations'), alias='CLICKHOUSE_MIGRATIONS_DIR')
     kafka_bootstrap_servers: str = Field(..., alias='UGC_KAFKA_BOOTSTRAP_SERVERS')
     kafka_topics: list = [
         "movie_progress-events",
@@ -21,8 +23,41 @@ class Settings(BaseSettings):
         "movie_details-events",
     ]
     etl_batch_size: int = Field(100, alias='UGC_ETL_BATCH_SIZE')
+    etl_batch_max_bytes: int = Field(16 * 1024 * 1024, alias='UGC_ETL_BATCH_MAX_BYTES')
+    etl_batch_linger_seconds: float = Field(5.0, alias='UGC_ETL_BATCH_LINGER_SECONDS')
     kafka_consume_timeout_seconds: int = Field(10, alias='UGC_ETL_KAFKA_CONSUME_TIMEOUT_SECONDS')
     kafka_consume_max_records: int = Field(1000, alias='UGC_ETL_KAFKA_CONSUME_MAX_RECORDS')
+    etl_adaptive_batching: bool = Field(False, alias='UGC_ETL_ADAPTIVE_BATCHING')
+    etl_batch_size_min: int = Field(100, alias='UGC_ETL_BATCH_SIZE_MIN')
+    etl_batch_size_max: int = Field(100_000, alias='UGC_ETL_BATCH_SIZE_MAX')
+    kafka_consume_max_records_min: int = Field(100, alias='UGC_ETL_KAFKA_CONSUME_MAX_RECORDS_MIN')
+    kafka_consume_max_records_max: int = Field(50_000, alias='UGC_ETL_KAFKA_CONSUME_MAX_RECORDS_MAX')
+    kafka_consume_timeout_seconds_min: float = Field(0.1, alias='UGC_ETL_KAFKA_CONSUME_TIMEOUT_SECONDS_MIN')
+    etl_target_flush_seconds: float = Field(2.0, alias='UGC_ETL_TARGET_FLUSH_SECONDS')
+    etl_lag_threshold: int = Field(10_000, alias='UGC_ETL_LAG_THRESHOLD')
+    etl_adjust_interval_seconds: float = Field(10.0, alias='UGC_ETL_ADJUST_INTERVAL_SECONDS')
+    etl_pipelined: bool = Field(False, alias='UGC_ETL_PIPELINED')
+    etl_pipeline_queue_size: int = Field(64, alias='UGC_ETL_PIPELINE_QUEUE_SIZE')
+    etl_workers: int = Field(1, alias='UGC_ETL_WORKERS')
+    etl_stats_interval_seconds: int = Field(30, alias='UGC_ETL_STATS_INTERVAL_SECONDS')
+    etl_dead_letter_topic: str = Field('etl_ugc-dead-letter', alias='UGC_ETL_DEAD_LETTER_TOPIC')
+    etl_dead_letter_spill_path: str = Field('./data/dead_letter.jsonl', alias='UGC_ETL_DEAD_LETTER_SPILL_PATH')
+    etl_metrics_port: int = Field(8004, alias='UGC_ETL_METRICS_PORT')
+    etl_log_sample_rate: float = Field(0.01, alias='UGC_ETL_LOG_SAMPLE_RATE')
+    etl_insert_format: Literal['values', 'native'] = Field('values', alias='UGC_ETL_INSERT_FORMAT')
+    etl_insert_max_tries: int = Field(5, alias='UGC_ETL_INSERT_MAX_TRIES')
+    etl_insert_max_time_seconds: float = Field(30.0, alias='UGC_ETL_INSERT_MAX_TIME_SECONDS')
+    etl_insert_deduplication: bool = Field(True, alias='UGC_ETL_INSERT_DEDUPLICATION')
+    etl_breaker_failure_threshold: int = Field(3, alias='UGC_ETL_BREAKER_FAILURE_THRESHOLD')
+    etl_breaker_recovery_seconds: float = Field(10.0, alias='UGC_ETL_BREAKER_RECOVERY_SECONDS')
+    etl_spill_enabled: bool = Field(True, alias='UGC_ETL_SPILL_ENABLED')
+    etl_spill_dir: str = Field('./data/spill', alias='UGC_ETL_SPILL_DIR')
+    etl_spill_segment_bytes: int = Field(64 * 1024 * 1024, alias='UGC_ETL_SPILL_SEGMENT_BYTES')
+    etl_spill_max_bytes: int = Field(2 * 1024 * 1024 * 1024, alias='UGC_ETL_SPILL_MAX_BYTES')
+    etl_dimension_cache_size: int = Field(100_000, alias='UGC_ETL_DIMENSION_CACHE_SIZE')
+    etl_search_rollup_interval_seconds: float = Field(300.0, alias='UGC_ETL_SEARCH_ROLLUP_INTERVAL_SECONDS')
+    etl_search_rollup_days: int = Field(1, alias='UGC_ETL_SEARCH_ROLLUP_DAYS')
+    etl_search_rollup_top_n: int = Field(1000, alias='UGC_ETL_SEARCH_ROLLUP_TOP_N')
 
     @property
     def clickhouse_url(self) -> str:
@@ -1,47 +1,108 @@
-from typing import Any, Optional
+import re
+from typing import Any, Dict, Optional, Sequence, Tuple
 
-from aiochclient import ChClient
+from aiochclient import ChClient, ChClientError
+from aiochclient.types import py2ch
+from aiohttp import ClientSession
+from core.config import settings
+from db.migrations import MigrationRunner
 from utils.abstract import AnalyticDatabaseService
 from utils.logger import logger
-from utils.sql_queries import MOVIE_DETAILS_QUERY, MOVIE_FILTERS_QUERY, MOVIE_PROGRESS_QUERY
+from utils.native import encode_block
+
+# Хвост INSERT, после которого идут данные: SETTINGS по грамматике ClickHouse стоят перед ним.
+INSERT_DATA_CLAUSE = re.compile(r"\s+(VALUES|FORMAT\s+\w+)\s*$", re.IGNORECASE)
+
+
+def add_query_settings(query: str, query_settings: Dict[str, Any]) -> str:
+    """`INSERT INTO t (...) VALUES` -> `INSERT INTO t (...) SETTINGS name = value VALUES`."""
+    clause = ", ".join(f"{name} = {py2ch(value).decode()}" for name, value in query_settings.items())
+    return INSERT_DATA_CLAUSE.sub(lambda match: f" SETTINGS {clause} {match.group(1)}", query.strip(), count=1)
 
 
 class ClickHouseAdapter(AnalyticDatabaseService):
     LOGNAME = "ClickHouseAdapter"
 
-    def __init__(self, client: ChClient):
+    def __init__(self, client: ChClient, session: ClientSession):
         self.client = client
+        self.session = session
 
     async def init(self):
+        """
+        Применение миграций схемы из каталога `migrations`. Ошибка останавливает запуск:
+        вставлять в частично мигрированную схему нельзя, а после перезапуска применение
+        продолжится с упавшего запроса.
+        """
         try:
-            await self.execute(MOVIE_PROGRESS_QUERY["create_table"])
-            await self.execute(MOVIE_FILTERS_QUERY["create_table"])
-            await self.execute(MOVIE_DETAILS_QUERY["create_table"])
-            logger.info(f"[{self.LOGNAME}] ClickHouse init tables created successfully")
+            applied = await MigrationRunner(self, settings.clickhouse_migrations_dir).apply()
+            logger.info(f"[{self.LOGNAME}] ClickHouse schema is up to date, {len(applied)} migrations applied")
         except Exception as e:
-            logger.error(f"[{self.LOGNAME}] Error occurred while creating init tables: {str(e)}")
+            logger.error(f"[{self.LOGNAME}] Error occurred while applying migrations: {str(e)}")
+            raise
 
     async def execute(
             self,
             query: str,
             *args,
             params: Optional[Any] = None,
-            query_id: Optional[str] = None
+            query_id: Optional[str] = None,
+            query_settings: Optional[Dict[str, Any]] = None
     ) -> Any:
+        if query_settings:
+            query = add_query_settings(query, query_settings)
         try:
             if not query.strip().upper().startswith("CREATE"):
-                logger.info(f'[{self.LOGNAME}] Executing query with params/args...')
+                logger.debug(f'[{self.LOGNAME}] Executing query with {len(args)} args...')
                 result = await self.client.execute(
                     query, *args, params=params, query_id=query_id
                 )
             else:
-                logger.info(f'[{self.LOGNAME}] Executing query without params/args...')
+                logger.debug(f'[{self.LOGNAME}] Executing query without params/args...')
                 result = await self.client.execute(query, query_id=query_id)
 
-            logger.info(f"[{self.LOGNAME}] Query executed successfully: {query}")
+            logger.debug(f"[{self.LOGNAME}] Query executed successfully: {query.strip().splitlines()[0]}")
             return result
         except Exception as e:
-            logger.error(f"[{self.LOGNAME}] Error executing {query}: {e}")
+            logger.error(f"[{self.LOGNAME}] Error executing {query.strip().splitlines()[0]}: {e}")
+            raise
+
+    async def insert_native(
+            self,
+            query: str,
+            columns_spec: Sequence[Tuple[str, str]],
+            columns: Sequence[Sequence[Any]],
+            query_id: Optional[str] = None,
+            query_settings: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Колоночная вставка одним телом в формате Native, минуя построчное форматирование VALUES."""
+        await self.insert_native_body(
+            query, encode_block(columns_spec, columns), query_id=query_id, query_settings=query_settings
+        )
+
+    async def insert_native_body(
+            self,
+            query: str,
+            body: bytes,
+            query_id: Optional[str] = None,
+            query_settings: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Вставка уже закодированного Native-блока, например из буфера на диске.
+        Настройки запроса передаются параметрами URL, как их принимает HTTP-интерфейс ClickHouse.
+        """
+        params = {**self.client.params, **(query_settings or {}), "query": query.strip()}
+        if query_id is not None:
+            params["query_id"] = query_id
+
+        try:
+            async with self.session.post(
+                self.client.url, params=params, headers=self.client.headers, data=body
+            ) as response:
+                if response.status != 200:
+                    raise ChClientError((await response.read()).decode(errors="replace"))
+            logger.debug(f"[{self.LOGNAME}] Native insert of {len(body)} bytes executed successfully")
+        except Exception as e:
+            logger.error(f"[{self.LOGNAME}] Error on native insert: {e}")
             raise
 
     async def fetch(
@@ -62,12 +123,13 @@ class ClickHouseAdapter(AnalyticDatabaseService):
             logger.error(f"[{self.LOGNAME}] Error on fetch: {e}")
             return None
 
-    async def health_check(self) -> Any:
+    async def health_check(self) -> bool:
         try:
             response = await self.fetch("SELECT version()")
             if response:
                 logger.info(f"[{self.LOGNAME}] Successfully connected")
-            else:
-                logger.error(f"[{self.LOGNAME}] Failed to get response: {response}")
+                return True
+            logger.error(f"[{self.LOGNAME}] Failed to get response: {response}")
         except Exception as e:
             logger.error(f"[{self.LOGNAME}] Error occurred while connecting: {str(e)}")
+        return False
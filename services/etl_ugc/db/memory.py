@@ -0,0 +1,84 @@
+import asyncio
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from aiochclient.types import rows2ch
+from utils.abstract import AnalyticDatabaseService
+from utils.native import encode_block, read_block_rows
+
+
+class InMemoryAnalyticDatabase(AnalyticDatabaseService):
+    """
+    ClickHouse без сети для профилирования ETL: тела вставок кодируются так же, как для
+    настоящего сервера, и отбрасываются после заданной задержки, а по таблицам ведётся счёт
+    строк, вставок и байт. Флаг `available` имитирует недоступность сервера.
+
+    Вставка с уже встречавшимся `insert_deduplication_token` отбрасывается, как это делает
+    ClickHouse, и учитывается в `deduplicated`.
+    """
+
+    LOGNAME = "InMemoryAnalyticDatabase"
+
+    def __init__(self, insert_latency_seconds: float = 0.0):
+        self.insert_latency_seconds = insert_latency_seconds
+        self.available = True
+        self.rows: Counter = Counter()
+        self.inserts: Counter = Counter()
+        self.bytes: Counter = Counter()
+        self.deduplicated: Counter = Counter()
+        self.deduplication_tokens: Set[Tuple[str, str]] = set()
+
+    async def init(self):
+        pass
+
+    async def health_check(self) -> bool:
+        return self.available
+
+    async def execute(
+            self,
+            query: str,
+            *args,
+            params: Optional[Any] = None,
+            query_id: Optional[str] = None,
+            query_settings: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        # Без строк это DDL или служебный запрос: схемы у заглушки нет.
+        if args:
+            await self.insert(query, rows2ch(*args), len(args), query_settings)
+
+    async def insert_native(
+            self,
+            query: str,
+            columns_spec: Sequence[Tuple[str, str]],
+            columns: Sequence[Sequence[Any]],
+            query_id: Optional[str] = None,
+            query_settings: Optional[Dict[str, Any]] = None
+    ) -> None:
+        await self.insert(query, encode_block(columns_spec, columns), len(columns[0]), query_settings)
+
+    async def insert_native_body(
+            self,
+            query: str,
+            body: bytes,
+            query_id: Optional[str] = None,
+            query_settings: Optional[Dict[str, Any]] = None
+    ) -> None:
+        await self.insert(query, body, read_block_rows(body), query_settings)
+
+    async def fetch(self, query: str, params: Optional[dict] = None) -> List[Any]:
+        return []
+
+    async def insert(self, query: str, body: bytes, rows_count: int, query_settings: Optional[Dict[str, Any]]):
+        if not self.available:
+            raise ConnectionRefusedError(f"[{self.LOGNAME}] ClickHouse is unavailable")
+        table = query.split()[2]
+        token = (query_settings or {}).get("insert_deduplication_token")
+        if token is not None:
+            if (table, token) in self.deduplication_tokens:
+                self.deduplicated[table] += rows_count
+                return
+            self.deduplication_tokens.add((table, token))
+        self.rows[table] += rows_count
+        self.inserts[table] += 1
+        self.bytes[table] += len(body)
+        await asyncio.sleep(self.insert_latency_seconds)
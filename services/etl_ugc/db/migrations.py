@@ -0,0 +1,161 @@
+import hashlib
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from utils.abstract import AnalyticDatabaseService
+from utils.logger import logger
+from utils.sql_queries import SCHEMA_MIGRATIONS_QUERY
+
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d+)_(\w+)\.sql$")
+EXCHANGE_PATTERN = re.compile(r"^EXCHANGE\s+TABLES\s+(\S+)\s+AND\s+(\S+)$", re.IGNORECASE)
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    sql: str
+
+    @property
+    def title(self) -> str:
+        return f"{self.version:04d}_{self.name}"
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.sql.encode()).hexdigest()
+
+    @property
+    def statements(self) -> List[str]:
+        return split_statements(self.sql)
+
+
+def split_statements(sql: str) -> List[str]:
+    """
+    Разбиение файла миграции на отдельные запросы: HTTP-интерфейс ClickHouse выполняет
+    по одному запросу за раз. Строки-комментарии `--` отбрасываются, запросы разделяются `;`
+    (внутри строковых литералов `;` не поддерживается).
+    """
+    lines = [line for line in sql.splitlines() if not line.lstrip().startswith("--")]
+    return [statement.strip() for statement in "\n".join(lines).split(";") if statement.strip()]
+
+
+def load_migrations(directory: str) -> List[Migration]:
+    migrations = []
+    for file_name in os.listdir(directory):
+        match = MIGRATION_FILE_PATTERN.match(file_name)
+        if not match:
+            continue
+        with open(os.path.join(directory, file_name), encoding="utf-8") as migration_file:
+            migrations.append(Migration(int(match.group(1)), match.group(2), migration_file.read()))
+
+    migrations.sort(key=lambda migration: migration.version)
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {directory}: {versions}")
+    return migrations
+
+
+class MigrationRunner:
+    """
+    Применение версионированных DDL-миграций из каталога `migrations`.
+
+    Файл `<версия>_<название>.sql` применяется один раз, после чего его версия и контрольная
+    сумма записываются в `schema_migrations`. DDL в ClickHouse не транзакционен, поэтому
+    каждый выполненный запрос миграции отмечается в `schema_migration_steps`: после сбоя
+    применение продолжается с упавшего запроса, и пересоздание таблиц с копированием данных
+    не выполняется повторно поверх уже переключённых таблиц. Сам упавший запрос будет
+    выполнен ещё раз, поэтому запросы должны быть идемпотентны (`IF NOT EXISTS`, `IF EXISTS`).
+
+    `EXCHANGE TABLES` идемпотентным не бывает: повтор после сбоя между обменом и отметкой шага
+    вернул бы старую таблицу на место. Перед обменом в `schema_migration_guards` записывается
+    uuid первой таблицы; если при повторе под этим именем уже другая таблица, обмен состоялся
+    и запрос не выполняется.
+    """
+
+    LOGNAME = "MigrationRunner"
+
+    def __init__(self, clickhouse_service: AnalyticDatabaseService, directory: str):
+        self.clickhouse_service = clickhouse_service
+        self.directory = directory
+
+    async def get_applied(self) -> Dict[int, str]:
+        await self.clickhouse_service.execute(SCHEMA_MIGRATIONS_QUERY["create_table"])
+        await self.clickhouse_service.execute(SCHEMA_MIGRATIONS_QUERY["create_steps_table"])
+        await self.clickhouse_service.execute(SCHEMA_MIGRATIONS_QUERY["create_guards_table"])
+        rows = await self.clickhouse_service.fetch(SCHEMA_MIGRATIONS_QUERY["select_applied"])
+        if rows is None:
+            raise RuntimeError("Failed to read applied migrations")
+        return {row["version"]: row["checksum"] for row in rows}
+
+    async def get_applied_steps(self, version: int) -> Set[int]:
+        rows = await self.clickhouse_service.fetch(
+            SCHEMA_MIGRATIONS_QUERY["select_steps"], params={"version": version}
+        )
+        if rows is None:
+            raise RuntimeError(f"Failed to read applied steps of migration {version}")
+        return {row["step"] for row in rows}
+
+    async def get_table_uuid(self, table: str) -> str:
+        database, _, name = table.rpartition(".")
+        rows = await self.clickhouse_service.fetch(
+            SCHEMA_MIGRATIONS_QUERY["select_table_uuid"], params={"database": database or "default", "name": name}
+        )
+        if not rows:
+            raise RuntimeError(f"Table {table} does not exist")
+        return rows[0]["uuid"]
+
+    async def get_guard(self, version: int, step: int) -> Optional[str]:
+        rows = await self.clickhouse_service.fetch(
+            SCHEMA_MIGRATIONS_QUERY["select_guard"], params={"version": version, "step": step}
+        )
+        if rows is None:
+            raise RuntimeError(f"Failed to read guard of migration {version} step {step}")
+        return rows[0]["table_uuid"] if rows else None
+
+    async def execute_statement(self, version: int, step: int, statement: str):
+        """Выполнение запроса миграции; `EXCHANGE TABLES` пропускается, если обмен уже состоялся."""
+        match = EXCHANGE_PATTERN.match(statement)
+        if match is None:
+            await self.clickhouse_service.execute(statement)
+            return
+
+        table_uuid = await self.get_table_uuid(match.group(1))
+        guard_uuid = await self.get_guard(version, step)
+        if guard_uuid is None:
+            await self.clickhouse_service.execute(SCHEMA_MIGRATIONS_QUERY["insert_guard"], (version, step, table_uuid))
+        elif guard_uuid != table_uuid:
+            logger.info(f"[{self.LOGNAME}] Tables of migration {version} step {step} are already exchanged")
+            return
+        await self.clickhouse_service.execute(statement)
+
+    async def apply(self) -> List[Migration]:
+        """Применение всех ещё не выполненных миграций по возрастанию версии."""
+        applied = await self.get_applied()
+        newly_applied = []
+        for migration in load_migrations(self.directory):
+            if migration.version in applied:
+                if applied[migration.version] != migration.checksum:
+                    logger.warning(
+                        f"[{self.LOGNAME}] Migration {migration.title} was changed "
+                        f"after it had been applied, the changes are ignored"
+                    )
+                continue
+
+            applied_steps = await self.get_applied_steps(migration.version)
+            if applied_steps:
+                logger.info(f"[{self.LOGNAME}] Resuming migration {migration.title} after step {max(applied_steps)}")
+            else:
+                logger.info(f"[{self.LOGNAME}] Applying migration {migration.title}")
+            for step, statement in enumerate(migration.statements):
+                if step in applied_steps:
+                    continue
+                await self.execute_statement(migration.version, step, statement)
+                await self.clickhouse_service.execute(
+                    SCHEMA_MIGRATIONS_QUERY["insert_step"], (migration.version, step)
+                )
+            await self.clickhouse_service.execute(
+                SCHEMA_MIGRATIONS_QUERY["insert_data"],
+                (migration.version, migration.name, migration.checksum)
+            )
+            newly_applied.append(migration)
+        return newly_applied
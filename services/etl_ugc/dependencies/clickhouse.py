@@ -6,4 +6,4 @@ from utils.abstract import AnalyticDatabaseService
 
 async def get_clickhouse_service(session: ClientSession, url: str) -> AnalyticDatabaseService:
     client = ChClient(session, url=url)
-    return ClickHouseAdapter(client)
+    return ClickHouseAdapter(client, session)
@@ -0,0 +1,8 @@
+from aiokafka import AIOKafkaConsumer
+from brokers.kafka import KafkaConsumerAdapter
+from utils.abstract import AsyncMessageConsumer
+
+
+def get_kafka_consumer(servers: str, group_id: str) -> AsyncMessageConsumer:
+    consumer = AIOKafkaConsumer(bootstrap_servers=servers, group_id=group_id, enable_auto_commit=False)
+    return KafkaConsumerAdapter(consumer)
@@ -1,11 +1,66 @@
 import asyncio
+import multiprocessing
+import os
+import signal
+import time
+from typing import Dict, Optional
 
 from aiohttp import ClientSession
 from core.config import settings
 from db.clickhouse import ClickHouseAdapter
 from dependencies.clickhouse import get_clickhouse_service
+from dependencies.kafka import get_kafka_consumer
+from services.dead_letter import DeadLetterQueue
 from services.etl import ETLService
+from services.pipeline import PipelinedETLService
+from services.rollups import SearchQueryRollup
+from services.spill import SpillBuffer
 from utils.logger import logger
+from utils.metrics import start_metrics_server
+
+
+def create_spill_buffer(worker_id: int) -> Optional[SpillBuffer]:
+    """У каждого воркера свой каталог буфера: сегменты пишет и воспроизводит один процесс."""
+    if not settings.etl_spill_enabled:
+        return None
+    return SpillBuffer(
+        directory=os.path.join(settings.etl_spill_dir, f"worker-{worker_id}"),
+        segment_max_bytes=settings.etl_spill_segment_bytes,
+        max_bytes=settings.etl_spill_max_bytes
+    )
+
+
+def create_etl_service(clickhouse_service: ClickHouseAdapter, worker_id: int = 0) -> ETLService:
+    etl_options = dict(
+        clickhouse_service=clickhouse_service,
+        consumer=get_kafka_consumer(settings.kafka_bootstrap_servers, group_id="etl_ugc"),
+        kafka_topics=settings.kafka_topics,
+        batch_size=settings.etl_batch_size,
+        batch_max_bytes=settings.etl_batch_max_bytes,
+        batch_linger_seconds=settings.etl_batch_linger_seconds,
+        dead_letter_queue=DeadLetterQueue(
+            kafka_servers=settings.kafka_bootstrap_servers,
+            topic=settings.etl_dead_letter_topic,
+            spill_path=settings.etl_dead_letter_spill_path
+        ),
+        spill_buffer=create_spill_buffer(worker_id)
+    )
+    if settings.etl_pipelined:
+        return PipelinedETLService(queue_size=settings.etl_pipeline_queue_size, **etl_options)
+    return ETLService(**etl_options)
+
+
+def start_search_rollup(clickhouse_service: ClickHouseAdapter) -> Optional[asyncio.Task]:
+    """Фоновый пересчёт дневного топа поисковых запросов; нулевой интервал отключает его."""
+    if not settings.etl_search_rollup_interval_seconds:
+        return None
+    rollup = SearchQueryRollup(
+        clickhouse_service,
+        interval_seconds=settings.etl_search_rollup_interval_seconds,
+        days=settings.etl_search_rollup_days,
+        top_n=settings.etl_search_rollup_top_n
+    )
+    return asyncio.create_task(rollup.run())
 
 
 async def main():
@@ -13,22 +68,141 @@ async def main():
     clickhouse_service: ClickHouseAdapter = (
         await get_clickhouse_service(session, url=settings.clickhouse_url)
     )
-    etl_service = ETLService(
-        clickhouse_service=clickhouse_service,
-        kafka_servers=settings.kafka_bootstrap_servers,
-        kafka_topics=settings.kafka_topics,
-        batch_size=settings.etl_batch_size
-    )
+    etl_service = create_etl_service(clickhouse_service)
+    start_metrics_server(settings.etl_metrics_port)
 
     await clickhouse_service.health_check()
 
+    rollup_task = None
     try:
         logger.info("Starting ETL process")
         await clickhouse_service.init()
+        rollup_task = start_search_rollup(clickhouse_service)
         await etl_service.start()
     finally:
+        if rollup_task is not None:
+            rollup_task.cancel()
+        await session.close()
+
+
+async def init_clickhouse():
+    async with ClientSession() as session:
+        clickhouse_service = await get_clickhouse_service(session, url=settings.clickhouse_url)
+        await clickhouse_service.health_check()
+        await clickhouse_service.init()
+
+
+async def run_worker(worker_id: int, inserted_events) -> None:
+    """Воркер читает свою часть партиций группы etl_ugc и публикует счётчик вставленных событий."""
+    session: ClientSession = ClientSession()
+    clickhouse_service = await get_clickhouse_service(session, url=settings.clickhouse_url)
+    etl_service = create_etl_service(clickhouse_service, worker_id)
+    # Каждый воркер отдаёт свои метрики на отдельном порту: base + номер воркера.
+    start_metrics_server(settings.etl_metrics_port + worker_id if settings.etl_metrics_port else 0)
+
+    reported = 0
+
+    def report_stats() -> None:
+        # Счётчик накапливается поверх значения предыдущего процесса, если воркер был перезапущен.
+        nonlocal reported
+        inserted_events[worker_id] += etl_service.inserted_events - reported
+        reported = etl_service.inserted_events
+
+    async def report_stats_periodically():
+        while True:
+            await asyncio.sleep(1)
+            report_stats()
+
+    reporter = asyncio.create_task(report_stats_periodically())
+    # Свёртки пересчитывает только первый воркер: остальные повторяли бы ту же работу.
+    rollup_task = start_search_rollup(clickhouse_service) if worker_id == 0 else None
+    try:
+        logger.info(f"[worker-{worker_id}] Starting ETL process")
+        await etl_service.consume_kafka()
+    finally:
+        reporter.cancel()
+        if rollup_task is not None:
+            rollup_task.cancel()
+        report_stats()
         await session.close()
 
 
+def worker_entrypoint(worker_id: int, inserted_events) -> None:
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(run_worker(worker_id, inserted_events))
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, task.cancel)
+    try:
+        loop.run_until_complete(task)
+    except asyncio.CancelledError:
+        logger.info(f"[worker-{worker_id}] Stopped")
+    finally:
+        loop.close()
+
+
+def run_workers(workers: int) -> None:
+    """
+    Запуск N процессов в одной consumer group: Kafka распределяет между ними партиции,
+    а при падении или остановке воркера перебалансирует их на оставшиеся.
+    """
+    asyncio.run(init_clickhouse())
+
+    context = multiprocessing.get_context("spawn")
+    inserted_events = context.Array("Q", workers, lock=False)
+    processes: Dict[int, multiprocessing.Process] = {}
+    stopping = False
+
+    def start_worker(worker_id: int) -> None:
+        process = context.Process(
+            target=worker_entrypoint, args=(worker_id, inserted_events), name=f"etl_ugc-worker-{worker_id}"
+        )
+        process.start()
+        processes[worker_id] = process
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for worker_id in range(workers):
+        start_worker(worker_id)
+    logger.info(f"Started {workers} ETL workers")
+
+    last_total: Optional[int] = None
+    last_time = time.monotonic()
+    while not stopping:
+        deadline = time.monotonic() + settings.etl_stats_interval_seconds
+        while not stopping and time.monotonic() < deadline:
+            time.sleep(1)
+        if stopping:
+            break
+
+        for worker_id, process in list(processes.items()):
+            if not process.is_alive():
+                logger.error(f"[worker-{worker_id}] Exited with code {process.exitcode}, restarting")
+                start_worker(worker_id)
+
+        now = time.monotonic()
+        total = sum(inserted_events)
+        if last_total is not None:
+            rate = (total - last_total) / (now - last_time)
+            logger.info(
+                f"Throughput: {rate:.0f} events/sec, {total} events inserted by {workers} workers "
+                f"({', '.join(str(count) for count in inserted_events)})"
+            )
+        last_total, last_time = total, now
+
+    logger.info("Stopping ETL workers")
+    for process in processes.values():
+        process.terminate()
+    for process in processes.values():
+        process.join()
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    if settings.etl_workers > 1:
+        run_workers(settings.etl_workers)
+    else:
+        asyncio.run(main())
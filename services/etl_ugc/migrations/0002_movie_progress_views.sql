@@ -0,0 +1,61 @@
+-- Агрегаты по movie_progress: таблицы AggregatingMergeTree и materialized view над ними.
+-- Заполнение по накопленным данным выполняется, только если таблица агрегатов ещё пуста.
+
+CREATE TABLE IF NOT EXISTS default.movie_progress_by_movie (
+    movie_id String,
+    viewers AggregateFunction(uniq, String),
+    completed_viewers AggregateFunction(uniqIf, String, UInt8),
+    avg_progress AggregateFunction(avg, Float32)
+) ENGINE = AggregatingMergeTree
+ORDER BY movie_id;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS default.movie_progress_by_movie_mv
+TO default.movie_progress_by_movie AS
+SELECT
+    movie_id,
+    uniqState(user_id) AS viewers,
+    uniqIfState(user_id, status = 'completed') AS completed_viewers,
+    avgState(progress) AS avg_progress
+FROM default.movie_progress
+GROUP BY movie_id;
+
+INSERT INTO default.movie_progress_by_movie
+SELECT
+    movie_id,
+    uniqState(user_id) AS viewers,
+    uniqIfState(user_id, status = 'completed') AS completed_viewers,
+    avgState(progress) AS avg_progress
+FROM default.movie_progress
+WHERE (SELECT count() FROM default.movie_progress_by_movie) = 0
+GROUP BY movie_id;
+
+CREATE TABLE IF NOT EXISTS default.movie_progress_daily (
+    day Date,
+    movie_id String,
+    viewers AggregateFunction(uniq, String),
+    completed_viewers AggregateFunction(uniqIf, String, UInt8),
+    avg_progress AggregateFunction(avg, Float32)
+) ENGINE = AggregatingMergeTree
+ORDER BY (day, movie_id);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS default.movie_progress_daily_mv
+TO default.movie_progress_daily AS
+SELECT
+    toDate(last_watched) AS day,
+    movie_id,
+    uniqState(user_id) AS viewers,
+    uniqIfState(user_id, status = 'completed') AS completed_viewers,
+    avgState(progress) AS avg_progress
+FROM default.movie_progress
+GROUP BY day, movie_id;
+
+INSERT INTO default.movie_progress_daily
+SELECT
+    toDate(last_watched) AS day,
+    movie_id,
+    uniqState(user_id) AS viewers,
+    uniqIfState(user_id, status = 'completed') AS completed_viewers,
+    avgState(progress) AS avg_progress
+FROM default.movie_progress
+WHERE (SELECT count() FROM default.movie_progress_daily) = 0
+GROUP BY day, movie_id;
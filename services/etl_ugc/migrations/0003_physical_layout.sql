@@ -0,0 +1,126 @@
+-- Физическая раскладка таблиц событий: помесячные партиции, TTL с переносом на холодный том
+-- и удалением, кодеки для колонок и вынесение метаданных фильма из movie_details в измерение
+-- movie_metadata. Каждая таблица пересоздаётся рядом как *_new, данные копируются, после чего
+-- таблицы атомарно меняются местами (EXCHANGE), а старая копия удаляется.
+--
+-- Том 'cold' объявлен в политике хранения hot_cold (services/clickhouse/config.d/storage.xml).
+-- Materialized view над movie_progress пересоздаются, чтобы читать из новой таблицы.
+
+DROP TABLE IF EXISTS default.movie_progress_new;
+
+CREATE TABLE default.movie_progress_new (
+    user_id String CODEC(ZSTD(1)),
+    movie_id String CODEC(ZSTD(1)),
+    progress Float32 CODEC(ZSTD(1)),
+    status Enum8('in_progress' = 1, 'completed' = 2),
+    last_watched DateTime CODEC(Delta, ZSTD(1))
+) ENGINE = ReplacingMergeTree(last_watched)
+PARTITION BY toYYYYMM(last_watched)
+ORDER BY (user_id, movie_id)
+TTL last_watched + INTERVAL 6 MONTH TO VOLUME 'cold',
+    last_watched + INTERVAL 24 MONTH DELETE
+SETTINGS storage_policy = 'hot_cold';
+
+INSERT INTO default.movie_progress_new (user_id, movie_id, progress, status, last_watched)
+SELECT user_id, movie_id, progress, status, last_watched
+FROM default.movie_progress;
+
+EXCHANGE TABLES default.movie_progress AND default.movie_progress_new;
+
+DROP TABLE IF EXISTS default.movie_progress_new;
+
+DROP VIEW IF EXISTS default.movie_progress_by_movie_mv;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS default.movie_progress_by_movie_mv
+TO default.movie_progress_by_movie AS
+SELECT
+    movie_id,
+    uniqState(user_id) AS viewers,
+    uniqIfState(user_id, status = 'completed') AS completed_viewers,
+    avgState(progress) AS avg_progress
+FROM default.movie_progress
+GROUP BY movie_id;
+
+DROP VIEW IF EXISTS default.movie_progress_daily_mv;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS default.movie_progress_daily_mv
+TO default.movie_progress_daily AS
+SELECT
+    toDate(last_watched) AS day,
+    movie_id,
+    uniqState(user_id) AS viewers,
+    uniqIfState(user_id, status = 'completed') AS completed_viewers,
+    avgState(progress) AS avg_progress
+FROM default.movie_progress
+GROUP BY day, movie_id;
+
+DROP TABLE IF EXISTS default.movie_filters_new;
+
+CREATE TABLE default.movie_filters_new (
+    user_id String CODEC(ZSTD(1)),
+    query LowCardinality(String),
+    page UInt32 CODEC(T64, ZSTD(1)),
+    size UInt32 CODEC(T64, ZSTD(1)),
+    date_event DateTime CODEC(Delta, ZSTD(1))
+) ENGINE = ReplacingMergeTree(date_event)
+PARTITION BY toYYYYMM(date_event)
+ORDER BY (user_id, query, date_event)
+TTL date_event + INTERVAL 3 MONTH TO VOLUME 'cold',
+    date_event + INTERVAL 12 MONTH DELETE
+SETTINGS storage_policy = 'hot_cold';
+
+INSERT INTO default.movie_filters_new (user_id, query, page, size, date_event)
+SELECT user_id, query, page, size, date_event
+FROM default.movie_filters;
+
+EXCHANGE TABLES default.movie_filters AND default.movie_filters_new;
+
+DROP TABLE IF EXISTS default.movie_filters_new;
+
+CREATE TABLE IF NOT EXISTS default.movie_metadata (
+    uuid String,
+    title String CODEC(ZSTD(3)),
+    imdb_rating Float32,
+    description String CODEC(ZSTD(3)),
+    genres Array(Tuple(genre_uuid String, name LowCardinality(String))) CODEC(ZSTD(3)),
+    actors Array(Tuple(actor_uuid String, full_name String)) CODEC(ZSTD(3)),
+    writers Array(Tuple(writer_uuid String, full_name String)) CODEC(ZSTD(3)),
+    directors Array(Tuple(director_uuid String, full_name String)) CODEC(ZSTD(3)),
+    updated_at DateTime
+) ENGINE = ReplacingMergeTree(updated_at)
+ORDER BY uuid;
+
+INSERT INTO default.movie_metadata
+SELECT
+    uuid,
+    argMax(title, date_event),
+    argMax(imdb_rating, date_event),
+    argMax(description, date_event),
+    argMax(genres, date_event),
+    argMax(actors, date_event),
+    argMax(writers, date_event),
+    argMax(directors, date_event),
+    max(date_event)
+FROM default.movie_details
+GROUP BY uuid;
+
+DROP TABLE IF EXISTS default.movie_details_new;
+
+CREATE TABLE default.movie_details_new (
+    user_id String CODEC(ZSTD(1)),
+    uuid String CODEC(ZSTD(1)),
+    date_event DateTime CODEC(Delta, ZSTD(1))
+) ENGINE = ReplacingMergeTree(date_event)
+PARTITION BY toYYYYMM(date_event)
+ORDER BY (user_id, uuid)
+TTL date_event + INTERVAL 6 MONTH TO VOLUME 'cold',
+    date_event + INTERVAL 24 MONTH DELETE
+SETTINGS storage_policy = 'hot_cold';
+
+INSERT INTO default.movie_details_new (user_id, uuid, date_event)
+SELECT user_id, uuid, date_event
+FROM default.movie_details;
+
+EXCHANGE TABLES default.movie_details AND default.movie_details_new;
+
+DROP TABLE IF EXISTS default.movie_details_new;
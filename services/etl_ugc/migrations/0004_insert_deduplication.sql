@@ -0,0 +1,18 @@
+-- Дедупликация вставок по insert_deduplication_token для таблиц, куда пишет ETL,
+-- и для таблиц агрегатов за их materialized view: иначе блок, отброшенный в исходной
+-- таблице, всё равно дошёл бы до агрегатов и задвоил их. У нереплицированных MergeTree
+-- окно дедупликации по умолчанию выключено. Окно считается в блоках: 10000 последних
+-- вставок покрывают и повторы с backoff, и воспроизведение буфера на диске после долгой
+-- недоступности сервера.
+
+ALTER TABLE default.movie_progress MODIFY SETTING non_replicated_deduplication_window = 10000;
+
+ALTER TABLE default.movie_filters MODIFY SETTING non_replicated_deduplication_window = 10000;
+
+ALTER TABLE default.movie_details MODIFY SETTING non_replicated_deduplication_window = 10000;
+
+ALTER TABLE default.movie_metadata MODIFY SETTING non_replicated_deduplication_window = 10000;
+
+ALTER TABLE default.movie_progress_by_movie MODIFY SETTING non_replicated_deduplication_window = 10000;
+
+ALTER TABLE default.movie_progress_daily MODIFY SETTING non_replicated_deduplication_window = 10000;
@@ -0,0 +1,51 @@
+-- Свёртки поисковых запросов из movie_filters.
+--
+-- search_queries_hourly пополняется materialized view при каждой вставке в movie_filters.
+-- search_queries_daily пересчитывает из почасовых агрегатов периодическая задача etl_ugc
+-- (services/rollups.py): версия строки - момент пересчёта, поэтому пересчёт идемпотентен
+-- и подбирает события, доехавшие с опозданием. Запросы нормализуются так же, как ключ
+-- кэша поиска в content: в нижнем регистре и без пробелов по краям.
+
+CREATE TABLE IF NOT EXISTS default.search_queries_hourly (
+    hour DateTime CODEC(Delta, ZSTD(1)),
+    query LowCardinality(String),
+    searches SimpleAggregateFunction(sum, UInt64),
+    users AggregateFunction(uniq, String)
+) ENGINE = AggregatingMergeTree
+PARTITION BY toYYYYMM(hour)
+ORDER BY (hour, query)
+TTL hour + INTERVAL 3 MONTH DELETE
+SETTINGS non_replicated_deduplication_window = 10000;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS default.search_queries_hourly_mv
+TO default.search_queries_hourly AS
+SELECT
+    toStartOfHour(date_event) AS hour,
+    lowerUTF8(trimBoth(query)) AS query,
+    count() AS searches,
+    uniqState(user_id) AS users
+FROM default.movie_filters
+WHERE trimBoth(query) != ''
+GROUP BY hour, query;
+
+INSERT INTO default.search_queries_hourly
+SELECT
+    toStartOfHour(date_event) AS hour,
+    lowerUTF8(trimBoth(query)) AS query,
+    count() AS searches,
+    uniqState(user_id) AS users
+FROM default.movie_filters
+WHERE trimBoth(query) != ''
+    AND (SELECT count() FROM default.search_queries_hourly) = 0
+GROUP BY hour, query;
+
+CREATE TABLE IF NOT EXISTS default.search_queries_daily (
+    day Date,
+    query LowCardinality(String),
+    searches UInt64,
+    users UInt64,
+    rolled_up_at DateTime
+) ENGINE = ReplacingMergeTree(rolled_up_at)
+PARTITION BY toYYYYMM(day)
+ORDER BY (day, query)
+TTL day + INTERVAL 12 MONTH DELETE;
@@ -1,15 +1,59 @@
 from datetime import datetime
-from typing import List, Literal
+from operator import itemgetter
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple, Type
 
-from pydantic import BaseModel
+import orjson
+from pydantic import AfterValidator, BaseModel, Field, TypeAdapter
+from typing_extensions import Annotated, TypedDict
+from utils.native import to_unix_timestamp
+
+
+person_fields = itemgetter('uuid', 'full_name')
+genre_fields = itemgetter('uuid', 'name')
+
+
+UINT32_MAX = 2 ** 32 - 1
+FLOAT32_MAX = 3.4028234663852886e38
+
+
+def check_datetime_range(value: datetime) -> datetime:
+    """DateTime в ClickHouse - беззнаковое 32-битное число секунд: от 1970-01-01 до 2106-02-07."""
+    if not 0 <= to_unix_timestamp(value) <= UINT32_MAX:
+        raise ValueError(f"Date {value} is out of ClickHouse DateTime range")
+    return value
+
+
+# Типы полей с диапазонами колонок ClickHouse: событие, которое не поместится в колонку,
+# отбраковывается при разборе и уходит в DLQ, а не роняет кодирование блока при вставке.
+UInt32 = Annotated[int, Field(ge=0, le=UINT32_MAX)]
+Float32 = Annotated[float, Field(ge=-FLOAT32_MAX, le=FLOAT32_MAX)]
+ClickHouseDateTime = Annotated[datetime, AfterValidator(check_datetime_range)]
+
+
+class Person(TypedDict):
+    uuid: str
+    full_name: str
+
+
+class Genre(TypedDict):
+    uuid: str
+    name: str
+
+
+def people_to_tuples(people: List[dict]) -> List[tuple]:
+    return list(map(person_fields, people))
+
+
+def genres_to_tuples(genres: List[dict]) -> List[tuple]:
+    return list(map(genre_fields, genres))
 
 
 class MovieProgressEvent(BaseModel):
     user_id: str
     movie_id: str
-    progress: float
+    progress: Float32
     status: Literal["in_progress", "completed"]
-    last_watched: datetime
+    last_watched: ClickHouseDateTime
 
     def as_tuple(self):
         return (
@@ -24,9 +68,9 @@ class MovieProgressEvent(BaseModel):
 class MovieFiltersEvent(BaseModel):
     user_id: str
     query: str
-    page: int
-    size: int
-    date_event: datetime
+    page: UInt32
+    size: UInt32
+    date_event: ClickHouseDateTime
 
     def as_tuple(self):
         return (
@@ -42,29 +86,105 @@ class MovieDetailsEvent(BaseModel):
     user_id: str
     uuid: str
     title: str
-    imdb_rating: float
+    imdb_rating: Float32
     description: str
-    genres: List[dict]
-    actors: List[dict]
-    writers: List[dict]
-    directors: List[dict]
-    date_event: datetime
+    genres: List[Genre]
+    actors: List[Person]
+    writers: List[Person]
+    directors: List[Person]
+    date_event: ClickHouseDateTime
 
     def as_tuple(self):
-        genres = [(genre['uuid'], genre['name']) for genre in self.genres]
-        actors = [(actor['uuid'], actor['full_name']) for actor in self.actors]
-        writers = [(writer['uuid'], writer['full_name']) for writer in self.writers]
-        directors = [(director['uuid'], director['full_name']) for director in self.directors]
-
         return (
             self.user_id,
             self.uuid,
             self.title,
             self.imdb_rating,
             self.description,
-            genres,
-            actors,
-            writers,
-            directors,
+            genres_to_tuples(self.genres),
+            people_to_tuples(self.actors),
+            people_to_tuples(self.writers),
+            people_to_tuples(self.directors),
             self.date_event,
         )
+
+
+DECODE_ERRORS = (ValueError, TypeError, KeyError)
+
+
+class BatchDecoder:
+    """
+    Пакетный разбор сообщений топика сразу в колонки таблицы.
+
+    Все сообщения склеиваются в один JSON-массив, разбираются orjson и валидируются одним
+    вызовом pydantic-core по TypedDict с полями модели события, без создания промежуточных
+    объектов моделей.
+    Порядок колонок совпадает с порядком полей модели и её `as_tuple`.
+    """
+
+    def __init__(self, model: Type[BaseModel], converters: Optional[Dict[str, Callable[[Any], Any]]] = None):
+        self.model = model
+        self.fields = list(model.model_fields)
+        row_type = TypedDict(
+            f"{model.__name__}Row",
+            {name: field.rebuild_annotation() for name, field in model.model_fields.items()},
+        )
+        self.adapter = TypeAdapter(List[row_type])
+        self.row_adapter = TypeAdapter(row_type)
+        self.converters = converters or {}
+
+    def decode(self, messages: List[bytes]) -> List[List[Any]]:
+        rows = self.adapter.validate_python(orjson.loads(b"[" + b",".join(messages) + b"]"))
+        if len(rows) != len(messages):
+            raise ValueError(f"Expected {len(messages)} events, decoded {len(rows)}")
+
+        columns = []
+        for name in self.fields:
+            column = [row[name] for row in rows]
+            converter = self.converters.get(name)
+            columns.append(list(map(converter, column)) if converter else column)
+        return columns
+
+    def decode_valid(self, messages: List[bytes]) -> Tuple[List[List[Any]], List[Tuple[int, str]]]:
+        """
+        Разбор пачки с отбраковкой некорректных сообщений.
+
+        Сначала пробуется быстрый пакетный путь; если в пачке есть битое сообщение,
+        сообщения разбираются по одному.
+
+        Returns:
+            Колонки корректных событий и пары (индекс сообщения, текст ошибки) для остальных.
+        """
+        try:
+            return self.decode(messages), []
+        except DECODE_ERRORS:
+            pass
+
+        rows, errors = [], []
+        for index, message in enumerate(messages):
+            try:
+                rows.append(self.convert_row(self.row_adapter.validate_python(orjson.loads(message))))
+            except DECODE_ERRORS as e:
+                errors.append((index, f"{type(e).__name__}: {e}"))
+        columns = [list(column) for column in zip(*rows)] if rows else [[] for _ in self.fields]
+        return columns, errors
+
+    def convert_row(self, row: Dict[str, Any]) -> List[Any]:
+        values = []
+        for name in self.fields:
+            converter = self.converters.get(name)
+            values.append(converter(row[name]) if converter else row[name])
+        return values
+
+
+MOVIE_PROGRESS_DECODER = BatchDecoder(MovieProgressEvent)
+MOVIE_FILTERS_DECODER = BatchDecoder(MovieFiltersEvent)
+MOVIE_DETAILS_DECODER = BatchDecoder(
+    MovieDetailsEvent,
+    converters={
+        "genres": genres_to_tuples,
+        "actors": people_to_tuples,
+        "writers": people_to_tuples,
+        "directors": people_to_tuples,
+    },
+)
@@ -0,0 +1,110 @@
+import time
+from typing import Optional
+
+from services.batch import FlushScheduler
+from utils.logger import logger
+from utils.metrics import BATCH_SIZE_LIMIT, FETCH_RECORDS_LIMIT
+
+
+class AdaptiveBatchController:
+    """
+    Подстройка размера батча и лимита чтения из Kafka по лагу consumer'а и задержке вставки.
+
+    Регулятор работает по схеме AIMD: пока есть лаг, а вставка укладывается в целевое время,
+    лимиты удваиваются, чтобы быстрее догнать поток; если вставка дольше целевого времени,
+    лимиты уменьшаются вдвое; когда лаг выбран, они плавно возвращаются к базовым значениям.
+    """
+
+    LOGNAME = "AdaptiveBatchController"
+
+    def __init__(
+        self,
+        scheduler: FlushScheduler,
+        batch_size: int,
+        min_batch_size: int,
+        max_batch_size: int,
+        fetch_records: int,
+        min_fetch_records: int,
+        max_fetch_records: int,
+        target_flush_seconds: float,
+        lag_threshold: int,
+        adjust_interval_seconds: float,
+    ):
+        self.scheduler = scheduler
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.min_fetch_records = min_fetch_records
+        self.max_fetch_records = max_fetch_records
+        # Базовые значения вне границ регулятора приводятся к ним сразу, а не после первой подстройки.
+        self.base_batch_size = self.clamp_batch_size(batch_size)
+        self.base_fetch_records = self.clamp_fetch_records(fetch_records)
+        self.target_flush_seconds = target_flush_seconds
+        self.lag_threshold = lag_threshold
+        self.adjust_interval_seconds = adjust_interval_seconds
+
+        self.batch_size = self.base_batch_size
+        self.fetch_records = self.base_fetch_records
+        self.lag = 0
+        self.slowest_flush_seconds = 0.0
+        self.adjusted_at = time.monotonic()
+        self.apply()
+
+    @property
+    def is_lagging(self) -> bool:
+        return self.lag > self.lag_threshold
+
+    def observe_lag(self, lag: int) -> None:
+        self.lag = lag
+
+    def observe_flush(self, seconds: float) -> None:
+        self.slowest_flush_seconds = max(self.slowest_flush_seconds, seconds)
+        self.maybe_adjust()
+
+    def maybe_adjust(self, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        if now - self.adjusted_at < self.adjust_interval_seconds:
+            return
+
+        if self.slowest_flush_seconds > self.target_flush_seconds:
+            factor = 0.5
+        elif self.is_lagging:
+            factor = 2.0
+        else:
+            factor = None
+
+        if factor is not None:
+            batch_size = int(self.batch_size * factor)
+            fetch_records = int(self.fetch_records * factor)
+        else:
+            batch_size = self.move_towards(self.batch_size, self.base_batch_size)
+            fetch_records = self.move_towards(self.fetch_records, self.base_fetch_records)
+
+        batch_size = self.clamp_batch_size(batch_size)
+        fetch_records = self.clamp_fetch_records(fetch_records)
+        if (batch_size, fetch_records) != (self.batch_size, self.fetch_records):
+            logger.info(
+                f"[{self.LOGNAME}] lag={self.lag}, slowest flush={self.slowest_flush_seconds:.2f}s: "
+                f"batch size {self.batch_size} -> {batch_size}, fetch records {self.fetch_records} -> {fetch_records}"
+            )
+            self.batch_size, self.fetch_records = batch_size, fetch_records
+            self.apply()
+
+        self.slowest_flush_seconds = 0.0
+        self.adjusted_at = now
+
+    def clamp_batch_size(self, batch_size: int) -> int:
+        return min(max(batch_size, self.min_batch_size), self.max_batch_size)
+
+    def clamp_fetch_records(self, fetch_records: int) -> int:
+        return min(max(fetch_records, self.min_fetch_records), self.max_fetch_records)
+
+    @staticmethod
+    def move_towards(value: int, target: int) -> int:
+        """Возврат к базовому значению на четверть разницы за шаг."""
+        return value + (target - value) // 4 if abs(target - value) >= 4 else target
+
+    def apply(self) -> None:
+        for table_batch in self.scheduler.batches.values():
+            table_batch.max_rows = self.batch_size
+        BATCH_SIZE_LIMIT.set(self.batch_size)
+        FETCH_RECORDS_LIMIT.set(self.fetch_records)
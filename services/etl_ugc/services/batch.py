@@ -0,0 +1,197 @@
+import asyncio
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from aiokafka import TopicPartition
+
+
+def get_batch_columns(table_query: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    """Раскладка колонок батча: событие целиком, если часть полей уходит в таблицы-измерения."""
+    return table_query.get("event_columns", table_query["columns"])
+
+
+def get_insert_targets(table_query: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Таблицы, в которые записывается батч. Измерения идут первыми: повторная вставка в
+    ReplacingMergeTree безопасна, а факт без строки измерения не останется после сбоя.
+    """
+    return [*table_query.get("dimensions", ()), table_query]
+
+
+def project_columns(
+    table_query: Dict[str, Any], target: Dict[str, Any], columns: List[List[Any]]
+) -> List[List[Any]]:
+    """Колонки батча, соответствующие колонкам целевой таблицы (по `source_columns` или по именам)."""
+    batch_names = [name for name, _ in get_batch_columns(table_query)]
+    target_names = target.get("source_columns", [name for name, _ in target["columns"]])
+    if target_names == batch_names:
+        return columns
+    return [columns[batch_names.index(name)] for name in target_names]
+
+
+class SealedBatch:
+    """
+    Батч, закрытый для новых событий на время записи. Пока его не удалось сохранить, колонки,
+    offset'ы и токен дедупликации не меняются, поэтому повторная вставка после сбоя или таймаута
+    совпадает с первой и отбрасывается ClickHouse, если первая на самом деле прошла.
+    """
+
+    def __init__(
+            self,
+            table_query: Dict[str, Any],
+            columns: List[List[Any]],
+            rows_count: int,
+            offsets: Dict[TopicPartition, int],
+            deduplication_token: str
+    ):
+        self.table_query = table_query
+        self.table = table_query["table"]
+        self.columns = columns
+        self.rows_count = rows_count
+        self.offsets = offsets
+        self.deduplication_token = deduplication_token
+        # Раскладка по целевым таблицам считается при первой попытке записи и тоже не меняется.
+        self.targets: Optional[List[Tuple[Dict[str, Any], List[List[Any]]]]] = None
+        self.changed: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return self.rows_count
+
+
+class TableBatch:
+    """
+    Колоночный буфер событий одной таблицы ClickHouse.
+
+    Перед записью накопленные события запечатываются в `sealed`, а новые копятся в буфере
+    заново: неудачная запись повторяется ровно для того же батча.
+    """
+
+    def __init__(self, table_query: Dict[str, Any], max_rows: int, max_bytes: int, max_linger_seconds: float):
+        self.table_query = table_query
+        self.table = table_query["table"]
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_linger_seconds = max_linger_seconds
+        self.columns: List[List[Any]] = [[] for _ in get_batch_columns(table_query)]
+        self.rows_count = 0
+        self.size_bytes = 0
+        self.started_at: Optional[float] = None
+        self.offsets: Dict[TopicPartition, int] = {}
+        self.first_offsets: Dict[TopicPartition, int] = {}
+        self.sealed: Optional[SealedBatch] = None
+        self.lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return self.rows_count
+
+    @property
+    def is_empty(self) -> bool:
+        """Пустой буфер не содержит ни строк, ни offset'ов, ожидающих коммита, ни незаписанного батча."""
+        return not self.rows_count and not self.offsets and self.sealed is None
+
+    def extend(self, columns: List[List[Any]], size_bytes: int) -> None:
+        """Добавление уже разложенных по колонкам событий."""
+        if not columns or not columns[0]:
+            return
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+        for column, values in zip(self.columns, columns):
+            column.extend(values)
+        self.rows_count += len(columns[0])
+        self.size_bytes += size_bytes
+
+    def track_offset(self, topic_partition: TopicPartition, first_offset: int, last_offset: int) -> None:
+        """Запомнить диапазон offset'ов партиции, попавший в батч."""
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+        self.first_offsets.setdefault(topic_partition, first_offset)
+        if last_offset > self.offsets.get(topic_partition, -1):
+            self.offsets[topic_partition] = last_offset
+
+    def get_deduplication_token(self) -> str:
+        """
+        Токен `insert_deduplication_token` по диапазонам offset'ов батча: повторная вставка
+        того же батча после сбоя или таймаута отбрасывается ClickHouse как дубликат.
+        """
+        return ",".join(
+            f"{topic_partition.topic}:{topic_partition.partition}:"
+            f"{self.first_offsets[topic_partition]}-{self.offsets[topic_partition]}"
+            for topic_partition in sorted(self.offsets)
+        )
+
+    def seconds_until_due(self, now: Optional[float] = None) -> Optional[float]:
+        """Сколько осталось до сброса по времени; None - буфер пуст."""
+        if self.sealed is not None:
+            return 0.0
+        if self.started_at is None:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, self.started_at + self.max_linger_seconds - now)
+
+    def is_due(self, now: Optional[float] = None) -> bool:
+        if self.is_empty:
+            return False
+        if self.rows_count >= self.max_rows or self.size_bytes >= self.max_bytes:
+            return True
+        return self.seconds_until_due(now) == 0
+
+    def seal(self) -> SealedBatch:
+        """
+        Запечатать накопленные события и очистить буфер под новые. Уже запечатанный батч,
+        который ещё не записан, возвращается как есть.
+
+        В offset'ах батча - следующий за последним прочитанным в каждой партиции, для коммита
+        после записи.
+        """
+        if self.sealed is None:
+            offsets = {topic_partition: offset + 1 for topic_partition, offset in self.offsets.items()}
+            self.sealed = SealedBatch(
+                self.table_query, self.columns, self.rows_count, offsets, self.get_deduplication_token()
+            )
+            self.clear()
+        return self.sealed
+
+    def clear(self) -> None:
+        self.columns = [[] for _ in get_batch_columns(self.table_query)]
+        self.offsets = {}
+        self.first_offsets = {}
+        self.rows_count = 0
+        self.size_bytes = 0
+        self.started_at = None
+
+
+class FlushScheduler:
+    """
+    Планировщик сброса буферов: батч таблицы уходит в ClickHouse по первому из условий -
+    число строк, объём в байтах или максимальное время ожидания.
+    """
+
+    def __init__(
+        self,
+        table_queries: Iterable[Dict[str, Any]],
+        max_rows: int,
+        max_bytes: int,
+        max_linger_seconds: float,
+    ):
+        self.batches: Dict[str, TableBatch] = {
+            table_query["table"]: TableBatch(table_query, max_rows, max_bytes, max_linger_seconds)
+            for table_query in table_queries
+        }
+
+    def get(self, table: str) -> TableBatch:
+        return self.batches[table]
+
+    def due(self) -> List[TableBatch]:
+        now = time.monotonic()
+        return [batch for batch in self.batches.values() if batch.is_due(now)]
+
+    def pending(self) -> List[TableBatch]:
+        return [batch for batch in self.batches.values() if not batch.is_empty]
+
+    def seconds_until_next_flush(self) -> Optional[float]:
+        now = time.monotonic()
+        deadlines = [
+            deadline for deadline in (batch.seconds_until_due(now) for batch in self.batches.values())
+            if deadline is not None
+        ]
+        return min(deadlines) if deadlines else None
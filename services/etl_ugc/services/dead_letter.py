@@ -0,0 +1,156 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+import orjson
+from aiokafka import AIOKafkaProducer, ConsumerRecord
+from utils.logger import logger
+from utils.metrics import EVENTS_DEAD_LETTERED
+
+
+class DeadLetterQueue:
+    """
+    Отправка непригодных для загрузки событий в отдельный топик Kafka.
+
+    К исходному сообщению добавляются заголовки с топиком, партицией, offset'ом и ошибкой.
+    Если Kafka недоступна, события дописываются в локальный JSON Lines файл, а producer
+    переподключается при следующих отправках с экспоненциально растущей паузой.
+    """
+
+    LOGNAME = "DeadLetterQueue"
+    RECONNECT_MIN_SECONDS = 1.0
+    RECONNECT_MAX_SECONDS = 60.0
+
+    def __init__(self, kafka_servers: str, topic: str, spill_path: str):
+        self.kafka_servers = kafka_servers
+        self.topic = topic
+        self.spill_path = spill_path
+        self.producer: Optional[AIOKafkaProducer] = None
+        self.sent = 0
+        self.spilled = 0
+        self.spill_lock = asyncio.Lock()
+        self.start_lock = asyncio.Lock()
+        self.reconnect_delay = self.RECONNECT_MIN_SECONDS
+        self.reconnect_at = 0.0
+
+    @property
+    def total(self) -> int:
+        return self.sent + self.spilled
+
+    async def start(self):
+        async with self.start_lock:
+            if self.producer is not None:
+                return
+            producer = AIOKafkaProducer(bootstrap_servers=self.kafka_servers, client_id="etl_ugc-dead-letter")
+            try:
+                await producer.start()
+            except Exception as e:
+                await producer.stop()
+                self.reconnect_at = time.monotonic() + self.reconnect_delay
+                logger.error(
+                    f"[{self.LOGNAME}] Kafka producer is unavailable, spilling to {self.spill_path} "
+                    f"and retrying in {self.reconnect_delay:.0f}s: {e}"
+                )
+                self.reconnect_delay = min(self.reconnect_delay * 2, self.RECONNECT_MAX_SECONDS)
+                return
+            self.producer = producer
+            self.reconnect_delay = self.RECONNECT_MIN_SECONDS
+            logger.info(f"[{self.LOGNAME}] Kafka producer started, dead letters go to {self.topic}")
+
+    async def ensure_producer(self) -> Optional[AIOKafkaProducer]:
+        """Producer для отправки; если его нет и пауза переподключения вышла, он запускается заново."""
+        if self.producer is None and time.monotonic() >= self.reconnect_at:
+            await self.start()
+        return self.producer
+
+    async def stop(self):
+        if self.producer is not None:
+            await self.producer.stop()
+
+    @staticmethod
+    def get_headers(message: ConsumerRecord, error: str) -> List[Tuple[str, bytes]]:
+        return [
+            ("source_topic", message.topic.encode()),
+            ("source_partition", str(message.partition).encode()),
+            ("source_offset", str(message.offset).encode()),
+            ("error", error.encode()),
+        ]
+
+    async def send(self, message: ConsumerRecord, error: str):
+        await self.send_many([message], [error])
+
+    async def send_many(self, messages: List[ConsumerRecord], errors: List[str]):
+        failed = list(zip(messages, errors))
+        producer = await self.ensure_producer()
+        if producer is not None:
+            failed = await self.produce(producer, messages, errors)
+        if failed:
+            await self.spill([message for message, _ in failed], [error for _, error in failed])
+        logger.warning(
+            f"[{self.LOGNAME}] Routed {len(messages)} malformed events from {messages[0].topic}, "
+            f"{self.total} in total"
+        )
+
+    async def produce(
+        self,
+        producer: AIOKafkaProducer,
+        messages: List[ConsumerRecord],
+        errors: List[str]
+    ) -> List[Tuple[ConsumerRecord, str]]:
+        """
+        Отправка сообщений в топик одним заходом: `send()` только добавляет сообщение в батч
+        producer'а, а подтверждения брокера ожидаются все вместе.
+
+        Returns:
+            Сообщения с ошибками, которые доставить не удалось: они дописываются в файл.
+        """
+        deliveries = []
+        failed = []
+        last_error: Optional[Exception] = None
+        for message, error in zip(messages, errors):
+            try:
+                delivery = await producer.send(
+                    self.topic, value=message.value, key=message.key, headers=self.get_headers(message, error)
+                )
+            except Exception as e:
+                failed.append((message, error))
+                last_error = e
+            else:
+                deliveries.append((message, error, delivery))
+
+        results = await asyncio.gather(*(delivery for _, _, delivery in deliveries), return_exceptions=True)
+        for (message, error, _), result in zip(deliveries, results):
+            if isinstance(result, Exception):
+                failed.append((message, error))
+                last_error = result
+            else:
+                self.sent += 1
+                EVENTS_DEAD_LETTERED.labels(message.topic, "kafka").inc()
+        if failed:
+            logger.error(
+                f"[{self.LOGNAME}] Failed to send {len(failed)} of {len(messages)} events to {self.topic}, "
+                f"spilling to file: {last_error}"
+            )
+        return failed
+
+    async def spill(self, messages: List[ConsumerRecord], errors: List[str]):
+        lines = b"".join(
+            orjson.dumps({
+                "topic": message.topic,
+                "partition": message.partition,
+                "offset": message.offset,
+                "error": error,
+                "value": (message.value or b"").decode("utf-8", errors="replace"),
+                "spilled_at": datetime.now(timezone.utc).isoformat(),
+            }) + b"\n"
+            for message, error in zip(messages, errors)
+        )
+        async with self.spill_lock:
+            os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+            with open(self.spill_path, "ab") as spill_file:
+                spill_file.write(lines)
+        self.spilled += len(messages)
+        for message in messages:
+            EVENTS_DEAD_LETTERED.labels(message.topic, "file").inc()
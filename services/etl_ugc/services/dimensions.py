@@ -0,0 +1,68 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Tuple
+
+import orjson
+from utils.metrics import DIMENSION_ROWS_SKIPPED
+
+CacheKey = Tuple[str, Hashable]
+
+
+class DimensionCache:
+    """
+    LRU-кэш строк таблиц-измерений, уже записанных в ClickHouse.
+
+    Для ключа строки (например, uuid фильма) хранится хэш её значений без колонки версии:
+    строка измерения вставляется только при первой встрече ключа или при изменении значений.
+    Кэш пополняется через `remember` лишь после записи батча в ClickHouse или в буфер на диске,
+    чтобы не дошедшая строка ушла повторно. Вытесненный ключ вставится ещё раз, а повтор
+    схлопнет ReplacingMergeTree.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: OrderedDict[CacheKey, int] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def select_changed(
+        self, target: Dict[str, Any], columns: List[List[Any]]
+    ) -> Tuple[List[List[Any]], Dict[CacheKey, int]]:
+        """
+        Строки измерения, которых ещё нет в кэше или которые изменились.
+
+        Returns:
+            Колонки отобранных строк и версии их ключей для `remember` после записи.
+        """
+        names = [name for name, _ in target["columns"]]
+        key_index = names.index(target["key_column"])
+        version_index = names.index(target["version_column"])
+        table = target["table"]
+
+        changed: Dict[CacheKey, int] = {}
+        rows = []
+        for row in zip(*columns):
+            cache_key = (table, row[key_index])
+            digest = hash(orjson.dumps(row[:version_index] + row[version_index + 1:]))
+            if cache_key in changed:
+                known = changed[cache_key]
+            else:
+                known = self.entries.get(cache_key)
+                if known is not None:
+                    self.entries.move_to_end(cache_key)
+            if known == digest:
+                continue
+            changed[cache_key] = digest
+            rows.append(row)
+
+        DIMENSION_ROWS_SKIPPED.labels(table).inc(len(columns[0]) - len(rows))
+        if not rows:
+            return [[] for _ in names], changed
+        return [list(column) for column in zip(*rows)], changed
+
+    def remember(self, changed: Dict[CacheKey, int]) -> None:
+        for cache_key, digest in changed.items():
+            self.entries[cache_key] = digest
+            self.entries.move_to_end(cache_key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
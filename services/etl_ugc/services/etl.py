@@ -1,21 +1,126 @@
-from typing import Any, Dict, List
+import asyncio
+import time
+from contextlib import aclosing
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-from aiokafka import AIOKafkaConsumer
+import backoff
+from aiochclient import ChClientError
+from aiohttp import ClientError
+from aiokafka import ConsumerRebalanceListener, ConsumerRecord, TopicPartition
 from core.config import settings
-from db.clickhouse import ClickHouseAdapter
-from schemas.events import MovieDetailsEvent, MovieFiltersEvent, MovieProgressEvent
+from schemas.events import MOVIE_DETAILS_DECODER, MOVIE_FILTERS_DECODER, MOVIE_PROGRESS_DECODER
+from services.adaptive import AdaptiveBatchController
+from services.batch import FlushScheduler, SealedBatch, TableBatch, get_insert_targets, project_columns
+from services.dead_letter import DeadLetterQueue
+from services.dimensions import CacheKey, DimensionCache
+from services.spill import SpillBuffer
+from utils.abstract import AnalyticDatabaseService, AsyncMessageConsumer
+from utils.circuit_breaker import CircuitBreaker
 from utils.logger import logger
+from utils.metrics import (BATCH_ROWS, CIRCUIT_OPEN, CONSUMER_LAG, EVENTS_CONSUMED, EVENTS_INSERTED, EVENTS_PARSED,
+                           EVENTS_REPLAYED, EVENTS_SPILLED, FLUSH_SECONDS, INSERT_FAILURES, INSERT_RETRIES,
+                           log_sampled)
+from utils.native import encode_block
 from utils.sql_queries import MOVIE_DETAILS_QUERY, MOVIE_FILTERS_QUERY, MOVIE_PROGRESS_QUERY
 
+TOPIC_TABLES = {
+    "movie_progress-events": MOVIE_PROGRESS_QUERY,
+    "movie_filters-events": MOVIE_FILTERS_QUERY,
+    "movie_details-events": MOVIE_DETAILS_QUERY,
+}
+
+EVENT_TABLES = {table_query["table"] for table_query in TOPIC_TABLES.values()}
+
+# Все таблицы, куда пишет ETL, включая измерения: по имени таблицы воспроизводится буфер на диске.
+TABLE_QUERIES = {
+    target["table"]: target
+    for table_query in TOPIC_TABLES.values()
+    for target in get_insert_targets(table_query)
+}
+
+TOPIC_DECODERS = {
+    "movie_progress-events": MOVIE_PROGRESS_DECODER,
+    "movie_filters-events": MOVIE_FILTERS_DECODER,
+    "movie_details-events": MOVIE_DETAILS_DECODER,
+}
+
+# Колонки батча, разложенные по целевым таблицам: (запросы таблицы, колонки).
+TargetColumns = List[Tuple[Dict[str, Any], List[List[Any]]]]
+
+# Ошибки, после которых вставку имеет смысл повторить: сеть, таймауты, отказ сервера ClickHouse.
+INSERT_ERRORS = (ChClientError, ClientError, asyncio.TimeoutError, OSError)
+
+
+def get_query_settings(deduplication_token: str) -> Optional[Dict[str, Any]]:
+    """
+    Настройки INSERT: по непустому токену ClickHouse отбрасывает повторную вставку того же блока,
+    причём и в таблицах агрегатов за materialized view исходной таблицы.
+    """
+    if not deduplication_token:
+        return None
+    return {
+        "insert_deduplication_token": deduplication_token,
+        "deduplicate_blocks_in_dependent_materialized_views": 1,
+    }
+
+
+def log_insert_retry(details: Dict[str, Any]):
+    table_batch = details["args"][1]
+    INSERT_RETRIES.labels(table_batch.table).inc()
+    logger.warning(
+        f"Insert of {len(table_batch)} {table_batch.table} events failed: {details['exception']}, "
+        f"retry #{details['tries']} in {details['wait']:.1f}s"
+    )
+
 
 class ETLService:
-    def __init__(self, clickhouse_service: ClickHouseAdapter, kafka_servers: str, kafka_topics: List[str], batch_size: int):
+    def __init__(
+        self,
+        clickhouse_service: AnalyticDatabaseService,
+        consumer: AsyncMessageConsumer,
+        kafka_topics: List[str],
+        batch_size: int,
+        batch_max_bytes: int,
+        batch_linger_seconds: float,
+        dead_letter_queue: DeadLetterQueue,
+        spill_buffer: Optional[SpillBuffer] = None
+    ):
         self.clickhouse_service = clickhouse_service
-        self.kafka_servers = kafka_servers
+        self.dead_letter_queue = dead_letter_queue
+        self.spill_buffer = spill_buffer
+        self.consumer = consumer
         self.kafka_topics = kafka_topics
         self.batch_size = batch_size
-        self.consumer = None
-        self.batch = []
+        self.inserted_events = 0
+        self.partition_lag: Dict[TopicPartition, int] = {}
+        self.commit_lock = asyncio.Lock()
+        self.recovery_lock = asyncio.Lock()
+        self.paused = False
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=settings.etl_breaker_failure_threshold,
+            recovery_timeout_seconds=settings.etl_breaker_recovery_seconds
+        )
+        self.dimension_cache = DimensionCache(settings.etl_dimension_cache_size)
+        self.scheduler = FlushScheduler(
+            TOPIC_TABLES.values(),
+            max_rows=batch_size,
+            max_bytes=batch_max_bytes,
+            max_linger_seconds=batch_linger_seconds
+        )
+        self.batch_controller: Optional[AdaptiveBatchController] = None
+        if settings.etl_adaptive_batching:
+            self.batch_controller = AdaptiveBatchController(
+                self.scheduler,
+                batch_size=batch_size,
+                min_batch_size=settings.etl_batch_size_min,
+                max_batch_size=settings.etl_batch_size_max,
+                fetch_records=settings.kafka_consume_max_records,
+                min_fetch_records=settings.kafka_consume_max_records_min,
+                max_fetch_records=settings.kafka_consume_max_records_max,
+                target_flush_seconds=settings.etl_target_flush_seconds,
+                lag_threshold=settings.etl_lag_threshold,
+                adjust_interval_seconds=settings.etl_adjust_interval_seconds,
+            )
 
     async def start(self):
         """Запуск ETL-сервиса."""
@@ -23,72 +128,403 @@ class ETLService:
         await self.consume_kafka()
 
     async def consume_kafka(self):
-        """Настройка и запуск Kafka consumer."""
-        self.consumer = AIOKafkaConsumer(
-            *self.kafka_topics,
-            bootstrap_servers=self.kafka_servers,
-            group_id="etl_ugc",
-            enable_auto_commit=False,
-        )
+        """Подписка consumer'а на топики событий и запуск цикла загрузки."""
+        self.consumer.subscribe(self.kafka_topics, listener=FlushOnRevokeListener(self))
+        await self.dead_letter_queue.start()
         await self.consumer.start()
         try:
             logger.info("Kafka consumer started")
-            while True:
-                messages = await self.consumer.getmany(
-                    timeout_ms=settings.kafka_consume_timeout_seconds * 1000,
-                    max_records=settings.kafka_consume_max_records
-                )
-                for topic_partition, messages_list in messages.items():
-                    logger.info(f"Got {len(messages)} messages from topic {topic_partition.topic}")
-                    topic = topic_partition.topic
-                    for message in messages_list:
-                        logger.info(f"Received message: {message.value}")
-                        event = self.parse_event(topic, message.value)
-                        self.batch.append(event)
-                        logger.info(f"Added message to batch. Size of batch after adding: {len(self.batch)}")
-
-                        if len(self.batch) >= self.batch_size:
-                            await self.process_batch(self.batch)
-                            self.batch = []
-
-                    await self.consumer.commit()
+            await self.run()
         finally:
+            await self.flush_pending()
             await self.consumer.stop()
+            await self.dead_letter_queue.stop()
+            if self.spill_buffer is not None:
+                self.spill_buffer.close()
 
-    def parse_event(self, topic: str, message: bytes) -> Dict[str, Any]:
-        """Парсинг и валидация событий в зависимости от топика."""
+    async def run(self):
+        """Последовательный цикл: чтение, разбор и вставка выполняются по очереди."""
+        while True:
+            messages = await self.fetch()
+            for topic_partition, messages_list in messages.items():
+                if topic_partition.topic not in TOPIC_TABLES:
+                    await self.handle_unknown_topic(topic_partition, messages_list)
+                    continue
+                table_batch = self.get_table_batch(topic_partition.topic)
+                columns, size_bytes = await self.parse_messages(topic_partition, messages_list)
+                table_batch.extend(columns, size_bytes)
+                table_batch.track_offset(topic_partition, messages_list[0].offset, messages_list[-1].offset)
+                logger.debug(f"Added messages to batch. Size of batch after adding: {len(table_batch)}")
 
-        message_str = message.decode("utf-8")
+            for table_batch in self.scheduler.due():
+                if not await self.process_batch(table_batch):
+                    break
+            await self.drain_spill()
+            if self.paused:
+                await self.wait_for_recovery()
 
-        if topic == "movie_progress-events":
-            return MovieProgressEvent.model_validate_json(message_str)
-        elif topic == "movie_filters-events":
-            return MovieFiltersEvent.model_validate_json(message_str)
-        elif topic == "movie_details-events":
-            return MovieDetailsEvent.model_validate_json(message_str)
-        else:
-            raise ValueError(f"Unknown topic: {topic}")
+    async def fetch(self) -> Dict[TopicPartition, List[ConsumerRecord]]:
+        messages = await self.consumer.getmany(
+            timeout_ms=self.get_fetch_timeout_ms(),
+            max_records=self.get_fetch_max_records()
+        )
+        for topic_partition, messages_list in messages.items():
+            logger.debug(f"Got {len(messages_list)} messages from topic {topic_partition.topic}")
+            EVENTS_CONSUMED.labels(topic_partition.topic).inc(len(messages_list))
+            self.track_lag(topic_partition, messages_list[-1].offset)
+        if self.batch_controller is not None:
+            self.batch_controller.observe_lag(sum(self.partition_lag.values()))
+        return messages
 
-    async def process_batch(self, batch: List[Dict[str, Any]]):
-        """Обработка батча событий и отправка их в ClickHouse."""
-        logger.info(f"Processing batch of {len(batch)} events")
+    def track_lag(self, topic_partition: TopicPartition, last_offset: int):
+        highwater = self.consumer.highwater(topic_partition)
+        if highwater is not None:
+            lag = highwater - last_offset - 1
+            self.partition_lag[topic_partition] = lag
+            CONSUMER_LAG.labels(topic_partition.topic, topic_partition.partition).set(lag)
 
-        progress_events = [event.as_tuple() for event in batch if isinstance(event, MovieProgressEvent)]
-        filters_events = [event.as_tuple() for event in batch if isinstance(event, MovieFiltersEvent)]
-        details_events = [event.as_tuple() for event in batch if isinstance(event, MovieDetailsEvent)]
+    def get_fetch_max_records(self) -> int:
+        if self.batch_controller is not None:
+            return self.batch_controller.fetch_records
+        return settings.kafka_consume_max_records
 
-        if progress_events:
-            await self.clickhouse_service.execute(
-                MOVIE_PROGRESS_QUERY["insert_data"],
-                *progress_events
-            )
-        if filters_events:
-            await self.clickhouse_service.execute(
-                MOVIE_FILTERS_QUERY["insert_data"],
-                *filters_events
+    async def parse_messages(
+        self,
+        topic_partition: TopicPartition,
+        messages: List[ConsumerRecord]
+    ) -> Tuple[List[List[Any]], int]:
+        """
+        Разбор сообщений одной партиции сразу в колонки таблицы и их суммарный объём в байтах.
+
+        Некорректные сообщения уходят в dead-letter очередь и не останавливают загрузку:
+        их offset'ы коммитятся вместе с батчем партиции.
+        """
+        values = [message.value for message in messages]
+        log_sampled(logger, settings.etl_log_sample_rate, "Received message: %s", values[0])
+        columns, errors = TOPIC_DECODERS[topic_partition.topic].decode_valid(values)
+        EVENTS_PARSED.labels(topic_partition.topic).inc(len(values) - len(errors))
+        if errors:
+            await self.dead_letter_queue.send_many(
+                [messages[index] for index, _ in errors],
+                [error for _, error in errors]
             )
-        if details_events:
-            await self.clickhouse_service.execute(
-                MOVIE_DETAILS_QUERY["insert_data"],
-                *details_events
+        return columns, sum(len(value) for value in values if value)
+
+    async def handle_unknown_topic(self, topic_partition: TopicPartition, messages: List[ConsumerRecord]):
+        """Сообщения топика без целевой таблицы целиком уходят в dead-letter очередь."""
+        await self.dead_letter_queue.send_many(messages, [f"Unknown topic: {topic_partition.topic}"] * len(messages))
+        await self.commit_offsets({topic_partition: messages[-1].offset + 1})
+
+    def get_table_batch(self, topic: str) -> TableBatch:
+        return self.scheduler.get(TOPIC_TABLES[topic]["table"])
+
+    def get_fetch_timeout_ms(self) -> int:
+        """Ожидание новых сообщений не дольше, чем до ближайшего сброса буфера по времени."""
+        timeout_seconds = self.get_base_fetch_timeout_seconds()
+        until_flush = self.scheduler.seconds_until_next_flush()
+        if until_flush is not None:
+            timeout_seconds = min(timeout_seconds, until_flush)
+        return int(timeout_seconds * 1000)
+
+    def get_base_fetch_timeout_seconds(self) -> float:
+        """При отставании consumer'а длинное ожидание только тормозит догоняющее чтение."""
+        if self.batch_controller is not None and self.batch_controller.is_lagging:
+            return settings.kafka_consume_timeout_seconds_min
+        return settings.kafka_consume_timeout_seconds
+
+    def discard_revoked(self, revoked: Set[TopicPartition]):
+        """
+        Отбрасывание прочитанных, но ещё не попавших в батч сообщений отозванных партиций.
+        В последовательном режиме таких сообщений нет: разбор идёт сразу после чтения.
+        """
+
+    async def flush_pending(self):
+        """Сброс всех непустых буферов при остановке сервиса."""
+        for table_batch in self.scheduler.pending():
+            try:
+                if not await self.process_batch(table_batch):
+                    logger.error(f"Failed to flush {len(table_batch)} pending {table_batch.table} events")
+            except Exception as e:
+                logger.error(f"Failed to flush {len(table_batch)} pending {table_batch.table} events: {e}")
+
+    async def process_batch(self, table_batch: TableBatch) -> bool:
+        """
+        Отправка накопленного батча таблицы в ClickHouse.
+
+        Offset'ы партиций, попавших в батч, коммитятся только после того, как события
+        записаны в ClickHouse или в буфер на диске, поэтому при падении сервиса
+        незаписанные события будут прочитаны повторно. Если сохранить батч не удалось,
+        он остаётся запечатанным в памяти и при следующей попытке отправляется без изменений,
+        а новые события копятся отдельно и записываются после него.
+
+        Returns:
+            False, если батч не сохранён: ClickHouse недоступен, а буфера на диске нет или он заполнен.
+        """
+        async with table_batch.lock:
+            while not table_batch.is_empty:
+                if self.paused and self.circuit_breaker.is_open:
+                    return False
+                sealed_batch = table_batch.seal()
+                logger.info(f"Processing batch of {len(sealed_batch)} {sealed_batch.table} events")
+
+                if len(sealed_batch) and not await self.write_batch(sealed_batch):
+                    return False
+                table_batch.sealed = None
+                await self.commit_offsets(sealed_batch.offsets)
+            return True
+
+    async def write_batch(self, table_batch: SealedBatch) -> bool:
+        """Запись колонок батча в ClickHouse, а при его недоступности - в буфер на диске."""
+        if table_batch.targets is None:
+            table_batch.targets, table_batch.changed = self.split_targets(
+                table_batch.table_query, table_batch.columns
             )
+        targets, changed = table_batch.targets, table_batch.changed
+        await self.probe_clickhouse()
+        if not self.circuit_breaker.is_open:
+            try:
+                await self.replay_spill()
+                start_time = time.perf_counter()
+                await self.insert_with_retry(table_batch, targets)
+            except INSERT_ERRORS as e:
+                self.on_insert_failure(table_batch, e)
+            else:
+                self.dimension_cache.remember(changed)
+                self.on_insert_success()
+                flush_seconds = time.perf_counter() - start_time
+                FLUSH_SECONDS.labels(table_batch.table).observe(flush_seconds)
+                if self.batch_controller is not None:
+                    self.batch_controller.observe_flush(flush_seconds)
+                BATCH_ROWS.labels(table_batch.table).observe(len(table_batch))
+                EVENTS_INSERTED.labels(table_batch.table).inc(len(table_batch))
+                self.inserted_events += len(table_batch)
+                return True
+
+        if await self.spill_batch(table_batch, targets):
+            self.dimension_cache.remember(changed)
+            return True
+        if self.circuit_breaker.is_open:
+            self.pause_consumption()
+        return False
+
+    @backoff.on_exception(
+        backoff.expo,
+        INSERT_ERRORS,
+        max_tries=lambda: settings.etl_insert_max_tries,
+        max_time=lambda: settings.etl_insert_max_time_seconds,
+        jitter=backoff.full_jitter,
+        on_backoff=log_insert_retry,
+        logger=None,
+    )
+    async def insert_with_retry(self, table_batch: SealedBatch, targets: TargetColumns):
+        """
+        Вставка с экспоненциальной задержкой между попытками и случайным разбросом (full jitter).
+        Все попытки идут с одним токеном дедупликации, поэтому вставка, которую ClickHouse
+        успел выполнить до обрыва соединения или таймаута, при повторе не задвоится.
+        """
+        await self.insert_columns(targets, self.get_deduplication_token(table_batch))
+
+    def get_deduplication_token(self, table_batch: SealedBatch) -> str:
+        if not settings.etl_insert_deduplication:
+            return ""
+        return table_batch.deduplication_token
+
+    def split_targets(
+        self, table_query: Dict[str, Any], columns: List[List[Any]]
+    ) -> Tuple[TargetColumns, Dict[CacheKey, int]]:
+        """
+        Колонки батча для каждой целевой таблицы. В измерения попадают только строки, которых
+        нет в DimensionCache или которые изменились; их версии запоминаются после записи батча.
+        """
+        targets = []
+        changed: Dict[CacheKey, int] = {}
+        for target in get_insert_targets(table_query):
+            target_columns = project_columns(table_query, target, columns)
+            if "key_column" in target:
+                target_columns, target_changed = self.dimension_cache.select_changed(target, target_columns)
+                changed.update(target_changed)
+            if target_columns[0]:
+                targets.append((target, target_columns))
+        return targets, changed
+
+    async def spill_batch(self, table_batch: SealedBatch, targets: TargetColumns) -> bool:
+        """Сохранение батча в буфер на диске, пока ClickHouse недоступен."""
+        if self.spill_buffer is None:
+            return False
+        deduplication_token = self.get_deduplication_token(table_batch)
+        records = [
+            (target["table"], len(target_columns[0]), encode_block(target["columns"], target_columns))
+            for target, target_columns in targets
+        ]
+        async with self.spill_buffer.lock:
+            if not self.spill_buffer.has_room(sum(len(body) for _, _, body in records)):
+                logger.error(
+                    f"Spill buffer is full ({self.spill_buffer.size_bytes} bytes), "
+                    f"keeping {len(table_batch)} {table_batch.table} events in memory"
+                )
+                return False
+            try:
+                for table, rows_count, body in records:
+                    await asyncio.to_thread(self.spill_buffer.append, table, rows_count, body, deduplication_token)
+            except OSError as e:
+                logger.error(f"Failed to spill {len(table_batch)} {table_batch.table} events to disk: {e}")
+                return False
+        EVENTS_SPILLED.labels(table_batch.table).inc(len(table_batch))
+        logger.warning(
+            f"Spilled {len(table_batch)} {table_batch.table} events to disk, "
+            f"{self.spill_buffer.size_bytes} bytes pending replay"
+        )
+        return True
+
+    async def replay_spill(self):
+        """
+        Вставка батчей из буфера на диске в порядке записи. Ошибка прерывает воспроизведение:
+        оставшиеся записи дождутся следующей попытки, а новый батч ляжет в буфер после них.
+        """
+        if self.spill_buffer is None or not self.spill_buffer.is_pending:
+            return
+        # aclosing закрывает сегмент сразу, если вставка прервала воспроизведение.
+        async with self.spill_buffer.lock, aclosing(self.spill_buffer.records()) as records:
+            replayed = 0
+            async for record in records:
+                query = TABLE_QUERIES[record.table]["insert_native"]
+                await self.clickhouse_service.insert_native_body(
+                    query, record.body, query_settings=get_query_settings(record.deduplication_token)
+                )
+                await self.spill_buffer.mark_replayed(record)
+                # Строки измерений дублируют события своего батча и в счётчики событий не входят.
+                if record.table not in EVENT_TABLES:
+                    continue
+                EVENTS_REPLAYED.labels(record.table).inc(record.rows_count)
+                EVENTS_INSERTED.labels(record.table).inc(record.rows_count)
+                self.inserted_events += record.rows_count
+                replayed += record.rows_count
+            logger.info(f"Replayed {replayed} spilled events into ClickHouse")
+
+    async def drain_spill(self):
+        """Воспроизведение буфера на диске без новых батчей, как только ClickHouse снова доступен."""
+        if self.spill_buffer is None or not self.spill_buffer.is_pending:
+            return
+        await self.probe_clickhouse()
+        if self.circuit_breaker.is_open:
+            return
+        try:
+            await self.replay_spill()
+        except INSERT_ERRORS as e:
+            logger.error(f"Failed to replay spilled events: {e}")
+            self.on_clickhouse_failure()
+        else:
+            self.on_insert_success()
+
+    def on_insert_failure(self, table_batch: SealedBatch, error: Exception):
+        INSERT_FAILURES.labels(table_batch.table).inc()
+        logger.error(
+            f"Failed to insert {len(table_batch)} {table_batch.table} events after retries "
+            f"({self.circuit_breaker.failures + 1} failures in a row): {error}"
+        )
+        self.on_clickhouse_failure()
+
+    def on_clickhouse_failure(self):
+        self.circuit_breaker.record_failure()
+        if self.circuit_breaker.is_open:
+            CIRCUIT_OPEN.set(1)
+            logger.error(f"ClickHouse circuit opened for {self.circuit_breaker.recovery_timeout_seconds}s")
+
+    def on_insert_success(self):
+        self.circuit_breaker.record_success()
+        CIRCUIT_OPEN.set(0)
+        if self.paused:
+            self.resume_consumption()
+
+    def pause_consumption(self):
+        """Остановка чтения всех закреплённых партиций: сообщения остаются в Kafka, а не в памяти."""
+        if self.paused:
+            return
+        partitions = self.consumer.assignment()
+        self.consumer.pause(*partitions)
+        self.paused = True
+        logger.error(f"Consumption of {len(partitions)} partitions paused until ClickHouse recovers")
+
+    def resume_consumption(self):
+        partitions = self.consumer.paused()
+        self.consumer.resume(*partitions)
+        self.paused = False
+        logger.info(f"ClickHouse circuit closed, consumption of {len(partitions)} partitions resumed")
+
+    async def probe_clickhouse(self):
+        """
+        Проверка доступности ClickHouse по истечении паузы разомкнутой цепи:
+        при успехе цепь полуоткрывается для пробной вставки.
+        """
+        if not self.circuit_breaker.is_open or self.circuit_breaker.seconds_until_retry():
+            return
+        if await self.clickhouse_service.health_check():
+            logger.info("ClickHouse is reachable again, retrying pending batches")
+            self.circuit_breaker.half_open()
+        else:
+            self.circuit_breaker.record_failure()
+
+    async def wait_for_recovery(self):
+        """Ожидание восстановления ClickHouse, пока чтение из Kafka приостановлено."""
+        async with self.recovery_lock:
+            while self.paused and self.circuit_breaker.is_open:
+                await asyncio.sleep(self.circuit_breaker.seconds_until_retry())
+                await self.probe_clickhouse()
+
+    async def commit_offsets(self, offsets: Dict[TopicPartition, int]):
+        """Коммит offset'ов только по партициям, которые всё ещё закреплены за этим consumer'ом."""
+        assignment = self.consumer.assignment()
+        offsets = {
+            topic_partition: offset for topic_partition, offset in offsets.items()
+            if topic_partition in assignment
+        }
+        if offsets:
+            async with self.commit_lock:
+                await self.consumer.commit(offsets)
+
+    async def insert_columns(self, targets: TargetColumns, deduplication_token: str = ""):
+        """
+        Вставка колонок батча в таблицу событий и её измерения: построчно через VALUES
+        или целиком в формате Native. Журнал дедупликации у каждой таблицы свой, поэтому
+        токен батча для них общий.
+        """
+        query_settings = get_query_settings(deduplication_token)
+        for target, target_columns in targets:
+            if settings.etl_insert_format == "native":
+                await self.clickhouse_service.insert_native(
+                    target["insert_native"],
+                    target["columns"],
+                    target_columns,
+                    query_settings=query_settings
+                )
+            else:
+                await self.clickhouse_service.execute(
+                    target["insert_data"],
+                    *zip(*target_columns),
+                    query_settings=query_settings
+                )
+
+
+class FlushOnRevokeListener(ConsumerRebalanceListener):
+    """
+    При перебалансировке группы сбрасывает накопленные батчи до того, как партиции
+    перейдут другому воркеру, чтобы их offset'ы успели закоммититься.
+    """
+
+    def __init__(self, etl_service: ETLService):
+        self.etl_service = etl_service
+
+    async def on_partitions_revoked(self, revoked):
+        if revoked:
+            logger.info(f"Partitions revoked: {sorted(str(tp) for tp in revoked)}, flushing pending batches")
+            # Новый владелец прочитает эти сообщения заново с закоммиченного offset'а.
+            self.etl_service.discard_revoked(revoked)
+            await self.etl_service.flush_pending()
+            for topic_partition in revoked:
+                self.etl_service.partition_lag.pop(topic_partition, None)
+
+    async def on_partitions_assigned(self, assigned):
+        logger.info(f"Partitions assigned: {sorted(str(tp) for tp in assigned)}")
+        if assigned and self.etl_service.paused:
+            # После перебалансировки пауза не сохраняется, а ClickHouse всё ещё недоступен.
+            self.etl_service.consumer.pause(*assigned)
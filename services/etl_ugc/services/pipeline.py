@@ -0,0 +1,129 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from aiokafka import ConsumerRecord, TopicPartition
+from services.batch import TableBatch
+from services.etl import TOPIC_TABLES, ETLService
+from utils.logger import logger
+
+ParsedChunk = Tuple[TopicPartition, List[List[Any]], int, int, int]
+
+
+class PipelinedETLService(ETLService):
+    """
+    Конвейерный режим ETL: чтение из Kafka, разбор событий и вставка в ClickHouse
+    выполняются отдельными задачами, связанными ограниченными очередями.
+
+    На каждую таблицу приходится собственный writer, поэтому вставки в разные таблицы идут
+    параллельно, а чтение продолжается, пока идёт сброс батча. Заполненные очереди
+    останавливают предыдущие стадии и ограничивают потребление памяти.
+    """
+
+    def __init__(self, *args, queue_size: int, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.queue_size = queue_size
+        self.fetched: Optional[asyncio.Queue] = None
+        self.writer_queues: Dict[str, asyncio.Queue] = {}
+
+    async def run(self):
+        self.fetched = asyncio.Queue(maxsize=self.queue_size)
+        self.writer_queues = {
+            table: asyncio.Queue(maxsize=self.queue_size) for table in self.scheduler.batches
+        }
+        tasks = [
+            asyncio.create_task(self.fetch_stage(), name="fetch"),
+            asyncio.create_task(self.parse_stage(), name="parse"),
+            asyncio.create_task(self.replay_stage(), name="replay"),
+        ]
+        tasks.extend(
+            asyncio.create_task(self.write_stage(table_batch), name=f"write-{table_batch.table}")
+            for table_batch in self.scheduler.batches.values()
+        )
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def discard_revoked(self, revoked: Set[TopicPartition]):
+        """
+        Удаление из очередей конвейера порций отозванных партиций: их offset'ы уже не
+        закоммитить, а новый владелец вставит те же события повторно.
+        """
+        queues = [self.fetched, *self.writer_queues.values()] if self.fetched is not None else []
+        discarded = 0
+        for queue in queues:
+            kept = []
+            while not queue.empty():
+                chunk = queue.get_nowait()
+                if chunk[0] in revoked:
+                    discarded += 1
+                else:
+                    kept.append(chunk)
+            for chunk in kept:
+                queue.put_nowait(chunk)
+        if discarded:
+            logger.info(f"Discarded {discarded} queued chunks of revoked partitions")
+
+    def is_assigned(self, topic_partition: TopicPartition) -> bool:
+        return topic_partition in self.consumer.assignment()
+
+    def get_fetch_timeout_ms(self) -> int:
+        # Сброс по времени выполняют writer'ы, чтение ждёт сообщений полный таймаут.
+        return int(self.get_base_fetch_timeout_seconds() * 1000)
+
+    async def fetch_stage(self):
+        while True:
+            messages = await self.fetch()
+            for topic_partition, messages_list in messages.items():
+                await self.fetched.put((topic_partition, messages_list))
+
+    async def parse_stage(self):
+        while True:
+            topic_partition, messages_list = await self.fetched.get()
+            if not self.is_assigned(topic_partition):
+                continue
+            if topic_partition.topic not in TOPIC_TABLES:
+                await self.handle_unknown_topic(topic_partition, messages_list)
+                continue
+            chunk = await self.parse_chunk(topic_partition, messages_list)
+            await self.writer_queues[self.get_table_batch(topic_partition.topic).table].put(chunk)
+
+    async def parse_chunk(self, topic_partition: TopicPartition, messages: List[ConsumerRecord]) -> ParsedChunk:
+        columns, size_bytes = await self.parse_messages(topic_partition, messages)
+        return topic_partition, columns, size_bytes, messages[0].offset, messages[-1].offset
+
+    async def replay_stage(self):
+        """Буфер на диске воспроизводится и тогда, когда новые события не приходят."""
+        while True:
+            await asyncio.sleep(self.circuit_breaker.recovery_timeout_seconds)
+            await self.drain_spill()
+
+    def add_chunk(self, table_batch: TableBatch, chunk: ParsedChunk):
+        topic_partition, columns, size_bytes, first_offset, last_offset = chunk
+        # Порция могла быть в обработке, пока её партицию отзывали при перебалансировке.
+        if self.is_assigned(topic_partition):
+            table_batch.extend(columns, size_bytes)
+            table_batch.track_offset(topic_partition, first_offset, last_offset)
+
+    async def write_stage(self, table_batch: TableBatch):
+        queue = self.writer_queues[table_batch.table]
+        while True:
+            timeout = table_batch.seconds_until_due()
+            try:
+                chunk = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                self.add_chunk(table_batch, chunk)
+                # Накопившиеся за время вставки порции уходят одним батчем, а не по одной на вставку.
+                while not queue.empty():
+                    self.add_chunk(table_batch, queue.get_nowait())
+
+            if table_batch.is_due():
+                logger.debug(f"[{table_batch.table}] Flushing batch, {queue.qsize()} chunks queued")
+                if not await self.process_batch(table_batch):
+                    await self.wait_for_recovery()
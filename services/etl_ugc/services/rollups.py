@@ -0,0 +1,53 @@
+import asyncio
+import time
+from datetime import datetime
+
+from utils.abstract import AnalyticDatabaseService
+from utils.logger import logger
+from utils.metrics import ROLLUP_SECONDS
+from utils.sql_queries import SEARCH_QUERIES_DAILY_QUERY
+
+
+class SearchQueryRollup:
+    """
+    Периодический пересчёт топа поисковых запросов по дням из почасовых агрегатов.
+
+    Почасовые агрегаты materialized view пополняет при каждой вставке в movie_filters, а
+    дневной топ пересчитывается целиком за сегодня и `days` предыдущих дней. Так события,
+    вставленные с опозданием (например, из буфера на диске), попадают и в прошедшие сутки.
+    После вставки строки прежних пересчётов этих дней удаляются, так что на день остаётся
+    ровно последний топ; API читает только строки последнего пересчёта дня и не видит
+    промежуточного состояния.
+    """
+
+    LOGNAME = "SearchQueryRollup"
+
+    def __init__(self, clickhouse_service: AnalyticDatabaseService, interval_seconds: float, days: int, top_n: int):
+        self.clickhouse_service = clickhouse_service
+        self.interval_seconds = interval_seconds
+        self.days = days
+        self.top_n = top_n
+
+    async def run(self):
+        while True:
+            try:
+                await self.rollup()
+            except Exception as e:
+                logger.error(f"[{self.LOGNAME}] Failed to roll up search queries: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def rollup(self):
+        start_time = time.perf_counter()
+        rolled_up_at = datetime.now().replace(microsecond=0)
+        await self.clickhouse_service.execute(
+            SEARCH_QUERIES_DAILY_QUERY["rollup"],
+            params={"days": self.days, "top_n": self.top_n, "rolled_up_at": rolled_up_at}
+        )
+        await self.clickhouse_service.execute(
+            SEARCH_QUERIES_DAILY_QUERY["delete_stale"], params={"days": self.days, "rolled_up_at": rolled_up_at}
+        )
+        rollup_seconds = time.perf_counter() - start_time
+        ROLLUP_SECONDS.labels(SEARCH_QUERIES_DAILY_QUERY["table"]).observe(rollup_seconds)
+        logger.info(
+            f"[{self.LOGNAME}] Rolled up search queries of the last {self.days + 1} days in {rollup_seconds:.2f}s"
+        )
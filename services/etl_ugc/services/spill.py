@@ -0,0 +1,193 @@
+import asyncio
+import mmap
+import os
+import re
+import struct
+import zlib
+from typing import AsyncIterator, BinaryIO, List, NamedTuple, Optional, Tuple
+
+from utils.logger import logger
+from utils.metrics import SPILL_BYTES
+
+SEGMENT_PATTERN = re.compile(r"^(\d{12})\.seg$")
+# Длина тела, CRC32 таблицы, токена и тела, число строк, длина имени таблицы, длина токена дедупликации.
+RECORD_HEADER = struct.Struct("<IIIHH")
+
+
+class SpillRecord(NamedTuple):
+    segment: int
+    end_position: int
+    table: str
+    rows_count: int
+    body: bytes
+    deduplication_token: str
+
+
+class SpillBuffer:
+    """
+    Append-only буфер батчей на диске на время недоступности ClickHouse.
+
+    Батч хранится уже закодированным в Native, вместе с именем таблицы и токеном
+    дедупликации, с которым его пытались вставить в ClickHouse. Записи дописываются
+    в текущий сегмент с fsync, поэтому после `append` offset'ы батча можно коммитить.
+    Чтение идёт через mmap строго в порядке записи; позиция чтения сохраняется в файле
+    `cursor`, а полностью воспроизведённые сегменты удаляются.
+
+    Хвост сегмента, оборванный падением процесса, распознаётся по длине и CRC и пропускается;
+    после перезапуска запись всегда начинается в новом сегменте.
+    """
+
+    LOGNAME = "SpillBuffer"
+
+    def __init__(self, directory: str, segment_max_bytes: int, max_bytes: int):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.max_bytes = max_bytes
+        self.lock = asyncio.Lock()
+        self.active: Optional[BinaryIO] = None
+
+        os.makedirs(directory, exist_ok=True)
+        self.segments: List[int] = sorted(
+            int(match.group(1)) for match in map(SEGMENT_PATTERN.match, os.listdir(directory)) if match
+        )
+        self.cursor = self.load_cursor()
+        self.last_segment = max(self.segments + [self.cursor[0]])
+        self.size_bytes = sum(os.path.getsize(self.segment_path(segment)) for segment in self.segments)
+        SPILL_BYTES.set(self.size_bytes)
+        if self.segments:
+            logger.warning(
+                f"[{self.LOGNAME}] Found {len(self.segments)} spilled segments ({self.size_bytes} bytes) in {directory}"
+            )
+
+    @property
+    def is_pending(self) -> bool:
+        return bool(self.segments)
+
+    def has_room(self, size_bytes: int) -> bool:
+        return self.size_bytes + size_bytes <= self.max_bytes
+
+    def segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:012d}.seg")
+
+    @property
+    def cursor_path(self) -> str:
+        return os.path.join(self.directory, "cursor")
+
+    def load_cursor(self) -> Tuple[int, int]:
+        try:
+            with open(self.cursor_path) as cursor_file:
+                segment, position = cursor_file.read().split()
+                return int(segment), int(position)
+        except (FileNotFoundError, ValueError):
+            return 0, 0
+
+    def save_cursor(self, segment: int, position: int) -> None:
+        self.cursor = (segment, position)
+        tmp_path = f"{self.cursor_path}.tmp"
+        with open(tmp_path, "w") as cursor_file:
+            cursor_file.write(f"{segment} {position}")
+            cursor_file.flush()
+            os.fsync(cursor_file.fileno())
+        os.replace(tmp_path, self.cursor_path)
+
+    def fsync_directory(self) -> None:
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def rotate(self) -> None:
+        self.close()
+        self.last_segment += 1
+        segment = self.last_segment
+        self.active = open(self.segment_path(segment), "ab")
+        self.segments.append(segment)
+        self.fsync_directory()
+
+    def close(self) -> None:
+        if self.active is not None:
+            self.active.close()
+            self.active = None
+
+    def append(self, table: str, rows_count: int, body: bytes, deduplication_token: str = "") -> None:
+        """Дописать батч и дождаться его сброса на диск."""
+        if self.active is None or self.active.tell() >= self.segment_max_bytes:
+            self.rotate()
+        table_bytes = table.encode()
+        token_bytes = deduplication_token.encode()
+        checksum = zlib.crc32(body, zlib.crc32(token_bytes, zlib.crc32(table_bytes)))
+        record = (
+            RECORD_HEADER.pack(len(body), checksum, rows_count, len(table_bytes), len(token_bytes))
+            + table_bytes + token_bytes + body
+        )
+        self.active.write(record)
+        self.active.flush()
+        os.fsync(self.active.fileno())
+        self.size_bytes += len(record)
+        SPILL_BYTES.set(self.size_bytes)
+
+    async def records(self) -> AsyncIterator[SpillRecord]:
+        """
+        Записи от сохранённой позиции чтения до конца последнего сегмента.
+
+        Следующая запись запрашивается только после обработки предыдущей, поэтому сегмент,
+        дочитанный до конца, удаляется. Вызывать под `lock`, чтобы запись не шла параллельно.
+        Чтение, проверка CRC и удаление сегментов, как и `append`, идут в отдельном потоке,
+        чтобы большой буфер не останавливал цикл событий.
+        """
+        for segment in list(self.segments):
+            start = self.cursor[1] if segment == self.cursor[0] else 0
+            async for record in self.read_segment(segment, start):
+                yield record
+            await asyncio.to_thread(self.release, segment)
+        await asyncio.to_thread(self.fsync_directory)
+
+    async def read_segment(self, segment: int, position: int) -> AsyncIterator[SpillRecord]:
+        with open(self.segment_path(segment), "rb") as segment_file:
+            size = os.fstat(segment_file.fileno()).st_size
+            if size <= position:
+                return
+            with mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                while True:
+                    record = await asyncio.to_thread(self.read_record, segment, data, position, size)
+                    if record is None:
+                        break
+                    yield record
+                    position = record.end_position
+
+        if position < size:
+            logger.error(
+                f"[{self.LOGNAME}] Skipping {size - position} bytes of a torn record at the end of segment {segment}"
+            )
+
+    @staticmethod
+    def read_record(segment: int, data: mmap.mmap, position: int, size: int) -> Optional[SpillRecord]:
+        """Запись, начинающаяся с позиции `position`; None - конец сегмента или оборванная запись."""
+        if position + RECORD_HEADER.size > size:
+            return None
+        body_length, checksum, rows_count, table_length, token_length = RECORD_HEADER.unpack_from(data, position)
+        table_start = position + RECORD_HEADER.size
+        token_start = table_start + table_length
+        body_start = token_start + token_length
+        end_position = body_start + body_length
+        if end_position > size:
+            return None
+        table_bytes = data[table_start:token_start]
+        token_bytes = data[token_start:body_start]
+        body = data[body_start:end_position]
+        if zlib.crc32(body, zlib.crc32(token_bytes, zlib.crc32(table_bytes))) != checksum:
+            return None
+        return SpillRecord(segment, end_position, table_bytes.decode(), rows_count, body, token_bytes.decode())
+
+    async def mark_replayed(self, record: SpillRecord) -> None:
+        await asyncio.to_thread(self.save_cursor, record.segment, record.end_position)
+
+    def release(self, segment: int) -> None:
+        if self.active is not None and segment == self.segments[-1]:
+            self.close()
+        path = self.segment_path(segment)
+        self.size_bytes -= os.path.getsize(path)
+        os.remove(path)
+        self.segments.remove(segment)
+        SPILL_BYTES.set(self.size_bytes)
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Any, Optional
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from aiokafka import ConsumerRebalanceListener, ConsumerRecord, TopicPartition
 
 
 class AnalyticDatabaseService(ABC):
@@ -7,14 +9,76 @@ class AnalyticDatabaseService(ABC):
     async def execute(self, key: str, params: Optional[dict] = None) -> Any:
         pass
 
+    @abstractmethod
+    async def insert_native(
+        self,
+        query: str,
+        columns_spec: Sequence[Tuple[str, str]],
+        columns: Sequence[Sequence[Any]],
+        query_settings: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        pass
+
+    @abstractmethod
+    async def insert_native_body(
+        self, query: str, body: bytes, query_settings: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        pass
+
     @abstractmethod
     async def fetch(self, key: str, params: Optional[dict] = None) -> Any:
         pass
 
     @abstractmethod
-    async def health_check(self) -> Any:
+    async def health_check(self) -> bool:
         pass
 
     @abstractmethod
     async def init(self) -> Any:
         pass
+
+
+class AsyncMessageConsumer(ABC):
+    """Чтение событий из брокера с ручным коммитом offset'ов, в терминах AIOKafkaConsumer."""
+
+    @abstractmethod
+    def subscribe(self, topics: List[str], listener: Optional[ConsumerRebalanceListener] = None):
+        pass
+
+    @abstractmethod
+    async def start(self):
+        pass
+
+    @abstractmethod
+    async def stop(self):
+        pass
+
+    @abstractmethod
+    async def getmany(
+        self, timeout_ms: int = 0, max_records: Optional[int] = None
+    ) -> Dict[TopicPartition, List[ConsumerRecord]]:
+        pass
+
+    @abstractmethod
+    async def commit(self, offsets: Dict[TopicPartition, int]):
+        pass
+
+    @abstractmethod
+    def assignment(self) -> Set[TopicPartition]:
+        pass
+
+    @abstractmethod
+    def pause(self, *partitions: TopicPartition):
+        pass
+
+    @abstractmethod
+    def resume(self, *partitions: TopicPartition):
+        pass
+
+    @abstractmethod
+    def paused(self) -> Set[TopicPartition]:
+        pass
+
+    @abstractmethod
+    def highwater(self, topic_partition: TopicPartition) -> Optional[int]:
+        pass
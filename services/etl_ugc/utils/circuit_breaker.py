@@ -0,0 +1,56 @@
+import time
+from enum import Enum
+from typing import Optional
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __str__(self):
+        return self.value
+
+
+class CircuitBreaker:
+    """
+    Автомат состояний для защиты от недоступного хранилища.
+
+    После `failure_threshold` подряд неудачных операций цепь размыкается (OPEN) на
+    `recovery_timeout_seconds`; затем допускается пробная операция (HALF_OPEN), успех
+    которой замыкает цепь, а неудача снова размыкает её.
+    """
+
+    def __init__(self, failure_threshold: int, recovery_timeout_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout_seconds = recovery_timeout_seconds
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def is_closed(self) -> bool:
+        return self.state == CircuitState.CLOSED
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == CircuitState.OPEN
+
+    def seconds_until_retry(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.recovery_timeout_seconds - time.monotonic())
+
+    def record_success(self) -> None:
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == CircuitState.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = CircuitState.OPEN
+            self.opened_at = time.monotonic()
+
+    def half_open(self) -> None:
+        self.state = CircuitState.HALF_OPEN
@@ -0,0 +1,73 @@
+import logging
+import random
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+EVENTS_CONSUMED = Counter(
+    "etl_ugc_events_consumed_total", "Events fetched from Kafka", ["topic"]
+)
+EVENTS_PARSED = Counter(
+    "etl_ugc_events_parsed_total", "Events successfully decoded", ["topic"]
+)
+EVENTS_DEAD_LETTERED = Counter(
+    "etl_ugc_events_dead_lettered_total", "Malformed events routed to the dead-letter queue", ["topic", "destination"]
+)
+EVENTS_INSERTED = Counter(
+    "etl_ugc_events_inserted_total", "Events inserted into ClickHouse", ["table"]
+)
+BATCH_ROWS = Histogram(
+    "etl_ugc_batch_rows", "Rows per flushed batch", ["table"],
+    buckets=(10, 50, 100, 500, 1_000, 5_000, 10_000, 50_000, 100_000, 500_000),
+)
+FLUSH_SECONDS = Histogram(
+    "etl_ugc_flush_seconds", "ClickHouse insert latency per batch", ["table"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+CONSUMER_LAG = Gauge(
+    "etl_ugc_consumer_lag", "Messages between the last fetched offset and the partition highwater",
+    ["topic", "partition"],
+)
+BATCH_SIZE_LIMIT = Gauge(
+    "etl_ugc_batch_size_limit", "Current row limit of a table batch"
+)
+FETCH_RECORDS_LIMIT = Gauge(
+    "etl_ugc_fetch_records_limit", "Current max_records of a Kafka fetch"
+)
+INSERT_RETRIES = Counter(
+    "etl_ugc_insert_retries_total", "ClickHouse insert attempts that failed and were retried", ["table"]
+)
+INSERT_FAILURES = Counter(
+    "etl_ugc_insert_failures_total", "Batches whose insert failed after all retries", ["table"]
+)
+CIRCUIT_OPEN = Gauge(
+    "etl_ugc_circuit_open", "1 while the ClickHouse circuit breaker is open"
+)
+EVENTS_SPILLED = Counter(
+    "etl_ugc_events_spilled_total", "Events written to the on-disk spill buffer instead of ClickHouse", ["table"]
+)
+EVENTS_REPLAYED = Counter(
+    "etl_ugc_events_replayed_total", "Spilled events replayed into ClickHouse", ["table"]
+)
+SPILL_BYTES = Gauge(
+    "etl_ugc_spill_bytes", "Size of the on-disk spill buffer"
+)
+DIMENSION_ROWS_SKIPPED = Counter(
+    "etl_ugc_dimension_rows_skipped_total", "Dimension rows skipped as unchanged since the last write", ["table"]
+)
+
+ROLLUP_SECONDS = Histogram(
+    "etl_ugc_rollup_seconds", "Duration of a periodic rollup query", ["table"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+
+def start_metrics_server(port: int) -> None:
+    """HTTP-эндпоинт /metrics в формате Prometheus; порт 0 отключает сервер."""
+    if port:
+        start_http_server(port)
+
+
+def log_sampled(logger: logging.Logger, sample_rate: float, message: str, *args) -> None:
+    """Выборочное DEBUG-логирование для горячего цикла: при выключенном DEBUG почти ничего не стоит."""
+    if logger.isEnabledFor(logging.DEBUG) and random.random() < sample_rate:
+        logger.debug(message, *args)
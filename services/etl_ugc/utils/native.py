@@ -0,0 +1,191 @@
+import calendar
+import re
+import struct
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+ENUM_VALUE_PATTERN = re.compile(r"'((?:[^'\\]|\\.)*)'\s*=\s*(-?\d+)")
+NAMED_ELEMENT_PATTERN = re.compile(r"^([A-Za-z_]\w*)\s+(.+)$")
+
+FIXED_WIDTH_FORMATS = {
+    "UInt8": "B",
+    "UInt16": "H",
+    "UInt32": "I",
+    "UInt64": "Q",
+    "Int8": "b",
+    "Int16": "h",
+    "Int32": "i",
+    "Int64": "q",
+    "Float32": "f",
+    "Float64": "d",
+}
+
+
+def encode_varint(value: int) -> bytes:
+    """Кодирование беззнакового целого в формате VarUInt (LEB128)."""
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def decode_varint(data: bytes, position: int = 0) -> Tuple[int, int]:
+    """Чтение VarUInt: значение и позиция следующего за ним байта."""
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def read_block_rows(body: bytes) -> int:
+    """Число строк блока Native по его заголовку: число колонок, затем число строк."""
+    _, position = decode_varint(body)
+    rows_count, _ = decode_varint(body, position)
+    return rows_count
+
+
+def encode_string(value: str) -> bytes:
+    data = value.encode("utf-8")
+    return encode_varint(len(data)) + data
+
+
+def to_unix_timestamp(value: datetime) -> int:
+    """Наивные даты считаются UTC - так же их интерпретирует сервер ClickHouse в контейнере."""
+    return calendar.timegm(value.utctimetuple())
+
+
+def split_type_arguments(arguments: str) -> List[str]:
+    """Разделение аргументов типа по запятым верхнего уровня: `String, Array(Tuple(String, String))`."""
+    parts, depth, quoted, start = [], 0, False, 0
+    for index, char in enumerate(arguments):
+        if char == "'" and (index == 0 or arguments[index - 1] != "\\"):
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(arguments[start:index].strip())
+            start = index + 1
+    parts.append(arguments[start:].strip())
+    return parts
+
+
+def unwrap_type(type_name: str, wrapper: str) -> str:
+    return type_name[len(wrapper) + 1:-1].strip()
+
+
+def encode_strings(values: Sequence[str]) -> bytes:
+    out = bytearray()
+    for value in values:
+        data = value.encode("utf-8")
+        size = len(data)
+        if size < 0x80:
+            out.append(size)
+        else:
+            out += encode_varint(size)
+        out += data
+    return bytes(out)
+
+
+def make_fixed_width_encoder(fmt: str) -> Callable[[Sequence[Any]], bytes]:
+    def encode(values: Sequence[Any]) -> bytes:
+        return struct.pack(f"<{len(values)}{fmt}", *values)
+    return encode
+
+
+def make_enum_encoder(type_name: str) -> Callable[[Sequence[str]], bytes]:
+    mapping = {name: int(code) for name, code in ENUM_VALUE_PATTERN.findall(type_name)}
+    fmt = "b" if type_name.startswith("Enum8") else "h"
+
+    def encode(values: Sequence[str]) -> bytes:
+        return struct.pack(f"<{len(values)}{fmt}", *(mapping[value] for value in values))
+    return encode
+
+
+def encode_datetimes(values: Sequence[datetime]) -> bytes:
+    return struct.pack(f"<{len(values)}I", *map(to_unix_timestamp, values))
+
+
+def make_array_encoder(type_name: str) -> Callable[[Sequence[Sequence[Any]]], bytes]:
+    encode_nested = get_column_encoder(unwrap_type(type_name, "Array"))
+
+    def encode(values: Sequence[Sequence[Any]]) -> bytes:
+        offsets, flat, total = [], [], 0
+        for value in values:
+            total += len(value)
+            offsets.append(total)
+            flat.extend(value)
+        return struct.pack(f"<{len(offsets)}Q", *offsets) + encode_nested(flat)
+    return encode
+
+
+def make_tuple_encoder(type_name: str) -> Callable[[Sequence[Sequence[Any]]], bytes]:
+    encoders = []
+    for element in split_type_arguments(unwrap_type(type_name, "Tuple")):
+        named = NAMED_ELEMENT_PATTERN.match(element)
+        encoders.append(get_column_encoder(named.group(2) if named else element))
+
+    def encode(values: Sequence[Sequence[Any]]) -> bytes:
+        elements = list(zip(*values)) if values else [()] * len(encoders)
+        return b"".join(encoder(column) for encoder, column in zip(encoders, elements))
+    return encode
+
+
+_ENCODERS_CACHE: Dict[str, Callable[[Sequence[Any]], bytes]] = {}
+
+
+def get_column_encoder(type_name: str) -> Callable[[Sequence[Any]], bytes]:
+    """Получение функции, кодирующей колонку значений заданного типа ClickHouse в формат Native."""
+    type_name = type_name.strip()
+    encoder = _ENCODERS_CACHE.get(type_name)
+    if encoder is not None:
+        return encoder
+
+    if type_name == "String":
+        encoder = encode_strings
+    elif type_name == "DateTime":
+        encoder = encode_datetimes
+    elif type_name in FIXED_WIDTH_FORMATS:
+        encoder = make_fixed_width_encoder(FIXED_WIDTH_FORMATS[type_name])
+    elif type_name.startswith(("Enum8(", "Enum16(")):
+        encoder = make_enum_encoder(type_name)
+    elif type_name.startswith("Array("):
+        encoder = make_array_encoder(type_name)
+    elif type_name.startswith("Tuple("):
+        encoder = make_tuple_encoder(type_name)
+    else:
+        raise ValueError(f"Unsupported ClickHouse type for Native format: {type_name}")
+
+    _ENCODERS_CACHE[type_name] = encoder
+    return encoder
+
+
+def encode_block(columns_spec: Sequence[Tuple[str, str]], columns: Sequence[Sequence[Any]]) -> bytes:
+    """
+    Кодирование блока данных в формат Native.
+
+    Args:
+        columns_spec: Пары (имя колонки, тип ClickHouse) в порядке вставки.
+        columns: Значения колонок в том же порядке, по одному списку на колонку.
+
+    Returns:
+        bytes: Тело запроса `INSERT ... FORMAT Native`.
+    """
+    rows_count = len(columns[0]) if columns else 0
+    parts = [encode_varint(len(columns_spec)), encode_varint(rows_count)]
+    for (name, type_name), values in zip(columns_spec, columns):
+        if len(values) != rows_count:
+            raise ValueError(f"Column {name} has {len(values)} values, expected {rows_count}")
+        parts.append(encode_string(name))
+        parts.append(encode_string(type_name))
+        parts.append(get_column_encoder(type_name)(values))
+    return b"".join(parts)
@@ -1,55 +1,184 @@
-MOVIE_PROGRESS_QUERY = {
+SCHEMA_MIGRATIONS_QUERY = {
+    "table": "schema_migrations",
     "create_table": """
-        CREATE TABLE IF NOT EXISTS default.movie_progress (
-            user_id String,
-            movie_id String,
-            progress Float32,
-            status Enum8('in_progress' = 1, 'completed' = 2),
-            last_watched DateTime
-        ) ENGINE = ReplacingMergeTree(last_watched)
-        PRIMARY KEY (user_id, movie_id);
+        CREATE TABLE IF NOT EXISTS default.schema_migrations (
+            version UInt32,
+            name String,
+            checksum String,
+            applied_at DateTime DEFAULT now()
+        ) ENGINE = MergeTree
+        ORDER BY version;
+    """,
+    "select_applied": """
+        SELECT version, checksum FROM default.schema_migrations
+    """,
+    "insert_data": """
+        INSERT INTO default.schema_migrations (version, name, checksum)
+        VALUES
+    """,
+    "create_steps_table": """
+        CREATE TABLE IF NOT EXISTS default.schema_migration_steps (
+            version UInt32,
+            step UInt32,
+            applied_at DateTime DEFAULT now()
+        ) ENGINE = MergeTree
+        ORDER BY (version, step);
+    """,
+    "select_steps": """
+        SELECT step FROM default.schema_migration_steps WHERE version = {version}
+    """,
+    "insert_step": """
+        INSERT INTO default.schema_migration_steps (version, step)
+        VALUES
     """,
+    "create_guards_table": """
+        CREATE TABLE IF NOT EXISTS default.schema_migration_guards (
+            version UInt32,
+            step UInt32,
+            table_uuid String,
+            created_at DateTime DEFAULT now()
+        ) ENGINE = MergeTree
+        ORDER BY (version, step);
+    """,
+    "select_guard": """
+        SELECT table_uuid FROM default.schema_migration_guards
+        WHERE version = {version} AND step = {step}
+        ORDER BY created_at
+        LIMIT 1
+    """,
+    "insert_guard": """
+        INSERT INTO default.schema_migration_guards (version, step, table_uuid)
+        VALUES
+    """,
+    "select_table_uuid": """
+        SELECT toString(uuid) AS uuid FROM system.tables WHERE database = {database} AND name = {name}
+    """,
+}
+
+MOVIE_PROGRESS_QUERY = {
+    "table": "movie_progress",
     "insert_data": """
         INSERT INTO default.movie_progress (user_id, movie_id, progress, status, last_watched)
         VALUES
     """,
+    "insert_native": """
+        INSERT INTO default.movie_progress (user_id, movie_id, progress, status, last_watched)
+        FORMAT Native
+    """,
+    "columns": (
+        ("user_id", "String"),
+        ("movie_id", "String"),
+        ("progress", "Float32"),
+        ("status", "Enum8('in_progress' = 1, 'completed' = 2)"),
+        ("last_watched", "DateTime"),
+    ),
 }
 
 MOVIE_FILTERS_QUERY = {
-    "create_table": """
-        CREATE TABLE IF NOT EXISTS default.movie_filters (
-            user_id String,
-            query String,
-            page UInt32,
-            size UInt32,
-            date_event DateTime
-        ) ENGINE = ReplacingMergeTree(date_event)
-        PRIMARY KEY (user_id, query, date_event);
-    """,
+    "table": "movie_filters",
     "insert_data": """
         INSERT INTO default.movie_filters (user_id, query, page, size, date_event)
         VALUES
     """,
+    "insert_native": """
+        INSERT INTO default.movie_filters (user_id, query, page, size, date_event)
+        FORMAT Native
+    """,
+    "columns": (
+        ("user_id", "String"),
+        ("query", "String"),
+        ("page", "UInt32"),
+        ("size", "UInt32"),
+        ("date_event", "DateTime"),
+    ),
 }
 
-MOVIE_DETAILS_QUERY = {
-    "create_table": """
-        CREATE TABLE IF NOT EXISTS default.movie_details (
-            user_id String,
-            uuid String,
-            title String,
-            imdb_rating Float32,
-            description String,
-            genres Array(Tuple(genre_uuid String, name String)),
-            actors Array(Tuple(actor_uuid String, full_name String)),
-            writers Array(Tuple(writer_uuid String, full_name String)),
-            directors Array(Tuple(director_uuid String, full_name String)),
-            date_event DateTime
-        ) ENGINE = ReplacingMergeTree(date_event)
-        PRIMARY KEY (user_id, uuid);
+MOVIE_METADATA_QUERY = {
+    "table": "movie_metadata",
+    "insert_data": """
+        INSERT INTO default.movie_metadata
+            (uuid, title, imdb_rating, description, genres, actors, writers, directors, updated_at)
+        VALUES
     """,
+    "insert_native": """
+        INSERT INTO default.movie_metadata
+            (uuid, title, imdb_rating, description, genres, actors, writers, directors, updated_at)
+        FORMAT Native
+    """,
+    "columns": (
+        ("uuid", "String"),
+        ("title", "String"),
+        ("imdb_rating", "Float32"),
+        ("description", "String"),
+        ("genres", "Array(Tuple(genre_uuid String, name String))"),
+        ("actors", "Array(Tuple(actor_uuid String, full_name String))"),
+        ("writers", "Array(Tuple(writer_uuid String, full_name String))"),
+        ("directors", "Array(Tuple(director_uuid String, full_name String))"),
+        ("updated_at", "DateTime"),
+    ),
+    # Колонки батча событий, из которых берутся значения колонок таблицы.
+    "source_columns": (
+        "uuid", "title", "imdb_rating", "description", "genres", "actors", "writers", "directors", "date_event",
+    ),
+    # Строка вставляется, только если метаданные фильма изменились с прошлой записи (DimensionCache).
+    "key_column": "uuid",
+    "version_column": "updated_at",
+}
+
+MOVIE_DETAILS_QUERY = {
+    "table": "movie_details",
     "insert_data": """
-        INSERT INTO default.movie_details (user_id, uuid, title, imdb_rating, description, genres, actors, writers, directors, date_event)
+        INSERT INTO default.movie_details (user_id, uuid, date_event)
         VALUES
     """,
+    "insert_native": """
+        INSERT INTO default.movie_details (user_id, uuid, date_event)
+        FORMAT Native
+    """,
+    "columns": (
+        ("user_id", "String"),
+        ("uuid", "String"),
+        ("date_event", "DateTime"),
+    ),
+    # Батч хранит событие целиком: факт просмотра пишется в movie_details,
+    # метаданные фильма - в измерение movie_metadata.
+    "event_columns": (
+        ("user_id", "String"),
+        ("uuid", "String"),
+        ("title", "String"),
+        ("imdb_rating", "Float32"),
+        ("description", "String"),
+        ("genres", "Array(Tuple(genre_uuid String, name String))"),
+        ("actors", "Array(Tuple(actor_uuid String, full_name String))"),
+        ("writers", "Array(Tuple(writer_uuid String, full_name String))"),
+        ("directors", "Array(Tuple(director_uuid String, full_name String))"),
+        ("date_event", "DateTime"),
+    ),
+    "dimensions": (MOVIE_METADATA_QUERY,),
+}
+
+SEARCH_QUERIES_DAILY_QUERY = {
+    "table": "search_queries_daily",
+    # Пересчёт последних дней из почасовых агрегатов: на каждый день остаются top_n запросов
+    # по числу пользователей, все строки пересчёта - с одним rolled_up_at.
+    "rollup": """
+        INSERT INTO default.search_queries_daily (day, query, searches, users, rolled_up_at)
+        SELECT
+            toDate(hour) AS rollup_day,
+            query,
+            sum(searches) AS total_searches,
+            uniqMerge(users) AS unique_users,
+            toDateTime({rolled_up_at})
+        FROM default.search_queries_hourly
+        WHERE hour >= toDateTime(today() - {days})
+        GROUP BY rollup_day, query
+        ORDER BY rollup_day, unique_users DESC, total_searches DESC
+        LIMIT {top_n} BY rollup_day
+    """,
+    # Строки прежних пересчётов тех же дней, в том числе запросов, выпавших из топа:
+    # ReplacingMergeTree заместил бы только строки с тем же запросом.
+    "delete_stale": """
+        DELETE FROM default.search_queries_daily
+        WHERE day >= today() - {days} AND rolled_up_at < toDateTime({rolled_up_at})
+    """,
 }
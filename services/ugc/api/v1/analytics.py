@@ -0,0 +1,97 @@
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from dependencies.clickhouse import get_clickhouse_service
+from dependencies.user import get_current_user_id, get_user_service
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from services.user import UserService
+from utils.abstract import AsyncAnalyticDatabaseService
+from utils.sql_queries import (DAILY_VIEWERS_QUERY, MOVIE_PROGRESS_STATS_QUERY, TOP_COMPLETED_MOVIES_QUERY,
+                               TOP_SEARCH_QUERIES_DAILY_QUERY, TOP_SEARCH_QUERIES_HOURLY_QUERY)
+
+router = APIRouter()
+
+
+@router.get("/movies/top_completed")
+async def get_top_completed_movies(
+    request: Request,
+    limit: int = Query(10, ge=1, le=100),
+    user_service: UserService = Depends(get_user_service),
+    clickhouse_service: AsyncAnalyticDatabaseService = Depends(get_clickhouse_service),
+):
+    await get_current_user_id(request, user_service)
+
+    movies = await clickhouse_service.fetch(TOP_COMPLETED_MOVIES_QUERY, params={"limit": limit})
+    return {"movies": movies}
+
+
+@router.get("/movies/{movie_id}/progress")
+async def get_movie_progress_stats(
+    request: Request,
+    movie_id: str,
+    user_service: UserService = Depends(get_user_service),
+    clickhouse_service: AsyncAnalyticDatabaseService = Depends(get_clickhouse_service),
+):
+    await get_current_user_id(request, user_service)
+
+    stats = await clickhouse_service.fetchrow(MOVIE_PROGRESS_STATS_QUERY, params={"movie_id": movie_id})
+    if not stats or not stats["viewers"]:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No progress events for this movie")
+    return {
+        "movie_id": movie_id,
+        "viewers": stats["viewers"],
+        "completed_viewers": stats["completed_viewers"],
+        "completion_rate": stats["completed_viewers"] / stats["viewers"],
+        "average_progress": stats["average_progress"],
+    }
+
+
+@router.get("/daily_viewers")
+async def get_daily_viewers(
+    request: Request,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    user_service: UserService = Depends(get_user_service),
+    clickhouse_service: AsyncAnalyticDatabaseService = Depends(get_clickhouse_service),
+):
+    await get_current_user_id(request, user_service)
+
+    date_to = date_to or date.today()
+    date_from = date_from or date_to - timedelta(days=30)
+    if date_from > date_to:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="date_from must not be after date_to")
+
+    days = await clickhouse_service.fetch(
+        DAILY_VIEWERS_QUERY, params={"date_from": date_from, "date_to": date_to}
+    )
+    return {"date_from": date_from, "date_to": date_to, "days": days}
+
+
+@router.get("/search_queries/hourly")
+async def get_top_search_queries_hourly(
+    request: Request,
+    hour: Optional[datetime] = None,
+    limit: int = Query(10, ge=1, le=100),
+    user_service: UserService = Depends(get_user_service),
+    clickhouse_service: AsyncAnalyticDatabaseService = Depends(get_clickhouse_service),
+):
+    await get_current_user_id(request, user_service)
+
+    hour = (hour or datetime.now()).replace(minute=0, second=0, microsecond=0, tzinfo=None)
+    queries = await clickhouse_service.fetch(TOP_SEARCH_QUERIES_HOURLY_QUERY, params={"hour": hour, "limit": limit})
+    return {"hour": hour, "queries": queries}
+
+
+@router.get("/search_queries/daily")
+async def get_top_search_queries_daily(
+    request: Request,
+    day: Optional[date] = None,
+    limit: int = Query(10, ge=1, le=100),
+    user_service: UserService = Depends(get_user_service),
+    clickhouse_service: AsyncAnalyticDatabaseService = Depends(get_clickhouse_service),
+):
+    await get_current_user_id(request, user_service)
+
+    day = day or date.today()
+    queries = await clickhouse_service.fetch(TOP_SEARCH_QUERIES_DAILY_QUERY, params={"day": day, "limit": limit})
+    return {"day": day, "queries": queries}
@@ -1,6 +1,8 @@
-from dependencies.user import get_user_service
+from beanie import PydanticObjectId, UpdateResponse
+from beanie.odm.operators.update.general import SetOnInsert
+from dependencies.user import get_current_user_id, get_user_service
 from fastapi import APIRouter, Depends, Request
-from schemas.bookmark import Bookmark
+from schemas.bookmark import Bookmark, find_user_bookmark, find_user_bookmarks
 from services.user import UserService
 
 router = APIRouter()
@@ -13,7 +15,7 @@ async def get_user_bookmarks(
 ):
     user_id = await user_service.get_user_id_from_jwt(request)
 
-    bookmarks = await Bookmark.find(Bookmark.user_id == user_id).to_list()
+    bookmarks = await find_user_bookmarks(user_id).to_list()
     return {"user_id": user_id, "bookmarks": bookmarks}
 
 
@@ -23,14 +25,19 @@ async def toggle_bookmark(
     movie_id: str,
     user_service: UserService = Depends(get_user_service),
 ):
-    user_id = await user_service.get_user_id_from_jwt(request)
-
-    existing_bookmark = await Bookmark.find_one(Bookmark.user_id == user_id, Bookmark.movie_id == movie_id)
-
-    if existing_bookmark:
-        await existing_bookmark.delete()
+    user_id = await get_current_user_id(request, user_service)
+
+    # Закладка снимается одним findAndModify. Если снимать было нечего, она создаётся upsert'ом:
+    # одновременная вставка той же закладки не падает на уникальном индексе, а клиент получает
+    # документ, который в итоге лежит в коллекции.
+    bookmark_query = find_user_bookmark(user_id, movie_id)
+    removed = await Bookmark.get_motor_collection().find_one_and_delete(bookmark_query.get_filter_query())
+    if removed is not None:
         return {"message": "Bookmark removed successfully"}
-    else:
-        bookmark = Bookmark(user_id=user_id, movie_id=movie_id)
-        await bookmark.create()
-        return {"message": "Bookmark created successfully", "bookmark": bookmark}
+
+    bookmark = await bookmark_query.update(
+        SetOnInsert({"_id": PydanticObjectId()}),
+        upsert=True,
+        response_type=UpdateResponse.NEW_DOCUMENT,
+    )
+    return {"message": "Bookmark created successfully", "bookmark": bookmark}
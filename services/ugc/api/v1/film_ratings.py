@@ -1,6 +1,10 @@
-from dependencies.user import get_user_service
+from beanie import PydanticObjectId, UpdateResponse
+from beanie.odm.operators.update.general import Set, SetOnInsert
+from dependencies.film_rating import get_film_rating_service
+from dependencies.user import get_current_user_id, get_user_service
 from fastapi import APIRouter, Depends, HTTPException, Request
-from schemas.film import FilmRating
+from schemas.film import FilmRating, find_user_rating
+from services.film_rating import FilmRatingService
 from services.user import UserService
 
 router = APIRouter()
@@ -12,20 +16,29 @@ async def rate_film(
     movie_id: str,
     stars: int,
     user_service: UserService = Depends(get_user_service),
+    film_rating_service: FilmRatingService = Depends(get_film_rating_service),
 ):
-    user_id = await user_service.get_user_id_from_jwt(request)
+    user_id = await get_current_user_id(request, user_service)
 
     if not (0 <= stars <= 10):
         raise HTTPException(status_code=400, detail="Rating must be between 0 and 10")
-    film_rating = await FilmRating.find_one(FilmRating.user_id == user_id, FilmRating.movie_id == movie_id)
-    if film_rating:
-        film_rating.stars = stars
-        await film_rating.save()
-        return {"message": "Rating updated successfully", "film_rating": film_rating}
+    # Оценка создаётся или меняется одним findAndModify; прежняя версия нужна для сводки.
+    # _id новой оценки задаётся заранее, чтобы вернуть клиенту сохранённый документ.
+    rating_id = PydanticObjectId()
+    old_rating = await find_user_rating(user_id, movie_id).update(
+        Set({FilmRating.stars: stars}),
+        SetOnInsert({"_id": rating_id}),
+        upsert=True,
+        response_type=UpdateResponse.OLD_DOCUMENT,
+    )
+    if old_rating:
+        await film_rating_service.change_rating(movie_id, old_rating.stars, stars)
+        old_rating.stars = stars
+        return {"message": "Rating updated successfully", "film_rating": old_rating}
     else:
-        new_rating = FilmRating(user_id=user_id, movie_id=movie_id, stars=stars)
-        await new_rating.create()
-        return {"message": "Rating created successfully", "film_rating": new_rating}
+        await film_rating_service.add_rating(movie_id, stars)
+        film_rating = FilmRating(id=rating_id, user_id=user_id, movie_id=movie_id, stars=stars)
+        return {"message": "Rating created successfully", "film_rating": film_rating}
 
 
 @router.get("/{movie_id}")
@@ -33,9 +46,16 @@ async def get_movie_ratings(
     request: Request,
     movie_id: str,
     user_service: UserService = Depends(get_user_service),
+    film_rating_service: FilmRatingService = Depends(get_film_rating_service),
 ):
     await user_service.get_user_id_from_jwt(request)
 
-    stars = await FilmRating.find(FilmRating.movie_id == movie_id).to_list()
-    average_rating = sum(r.stars for r in stars) / len(stars) if stars else 0
-    return {"movie_id": movie_id, "average_rating": average_rating, "ratings_count": len(stars)}
+    summary = await film_rating_service.get_rating_summary(movie_id)
+    if summary is None or not summary.ratings_count:
+        return {"movie_id": movie_id, "average_rating": 0, "ratings_count": 0, "histogram": {}}
+    return {
+        "movie_id": movie_id,
+        "average_rating": summary.stars_sum / summary.ratings_count,
+        "ratings_count": summary.ratings_count,
+        "histogram": {stars: count for stars, count in summary.histogram.items() if count},
+    }
@@ -0,0 +1,35 @@
+from dependencies.progress import get_progress_service
+from dependencies.user import get_current_user_id, get_user_service
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from services.progress import ProgressService
+from services.user import UserService
+
+router = APIRouter()
+
+
+@router.get("/continue_watching")
+async def get_continue_watching(
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    user_service: UserService = Depends(get_user_service),
+    progress_service: ProgressService = Depends(get_progress_service),
+):
+    user_id = await get_current_user_id(request, user_service)
+
+    movies = await progress_service.get_continue_watching(user_id, limit)
+    return {"user_id": user_id, "movies": movies}
+
+
+@router.get("/movies/{movie_id}")
+async def get_movie_progress(
+    request: Request,
+    movie_id: str,
+    user_service: UserService = Depends(get_user_service),
+    progress_service: ProgressService = Depends(get_progress_service),
+):
+    user_id = await get_current_user_id(request, user_service)
+
+    progress = await progress_service.get_movie_progress(user_id, movie_id)
+    if progress is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No progress for this movie")
+    return progress
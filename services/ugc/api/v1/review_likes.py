@@ -1,6 +1,10 @@
-from dependencies.user import get_user_service
-from fastapi import APIRouter, Depends, Request
-from schemas.review import ReviewLike
+from beanie import PydanticObjectId, UpdateResponse
+from beanie.odm.operators.update.general import Set, SetOnInsert
+from dependencies.review import get_review_service
+from dependencies.user import get_current_user_id, get_user_service
+from fastapi import APIRouter, Depends, HTTPException, Request
+from schemas.review import Review, ReviewLike, find_user_review_like
+from services.review import ReviewService
 from services.user import UserService
 
 router = APIRouter()
@@ -12,18 +16,33 @@ async def like_review(
     review_id: str,
     is_liked: bool,
     user_service: UserService = Depends(get_user_service),
+    review_service: ReviewService = Depends(get_review_service),
 ):
-    user_id = await user_service.get_user_id_from_jwt(request)
+    user_id = await get_current_user_id(request, user_service)
 
-    existing_like = await ReviewLike.find_one(ReviewLike.user_id == user_id, ReviewLike.review_id == review_id)
-    if existing_like:
-        existing_like.is_liked = is_liked
-        await existing_like.save()
-        return {"message": "Review like updated successfully", "review_like": existing_like}
+    # Оценка несуществующей рецензии осталась бы в коллекции, а $inc счётчика ничего бы не нашёл.
+    review_exists = PydanticObjectId.is_valid(review_id) and await Review.find(
+        Review.id == PydanticObjectId(review_id)
+    ).exists()
+    if not review_exists:
+        raise HTTPException(status_code=404, detail="Review not found")
+    # Оценка рецензии создаётся или меняется одним findAndModify; прежняя версия нужна для счётчиков.
+    # _id новой оценки задаётся заранее, чтобы вернуть клиенту сохранённый документ.
+    like_id = PydanticObjectId()
+    old_like = await find_user_review_like(user_id, review_id).update(
+        Set({ReviewLike.is_liked: is_liked}),
+        SetOnInsert({"_id": like_id}),
+        upsert=True,
+        response_type=UpdateResponse.OLD_DOCUMENT,
+    )
+    if old_like:
+        await review_service.change_like(review_id, bool(old_like.is_liked), is_liked)
+        old_like.is_liked = is_liked
+        return {"message": "Review like updated successfully", "review_like": old_like}
     else:
-        new_like = ReviewLike(user_id=user_id, review_id=review_id, is_liked=is_liked)
-        await new_like.create()
-        return {"message": "Review like created successfully", "review_like": new_like}
+        await review_service.add_like(review_id, is_liked)
+        review_like = ReviewLike(id=like_id, user_id=user_id, review_id=review_id, is_liked=is_liked)
+        return {"message": "Review like created successfully", "review_like": review_like}
 
 
 @router.get("/{review_id}")
@@ -33,7 +52,7 @@ async def get_review_likes(
 ):
     await user_service.get_user_id_from_jwt(request)
 
-    likes = await ReviewLike.find(ReviewLike.review_id == review_id).to_list()
-    total_likes = sum(1 for like in likes if like.is_liked)
-    total_dislikes = sum(1 for like in likes if not like.is_liked)
-    return {"review_id": review_id, "likes": total_likes, "dislikes": total_dislikes}
+    review = await Review.get(review_id) if PydanticObjectId.is_valid(review_id) else None
+    if not review:
+        raise HTTPException(status_code=404, detail="Review not found")
+    return {"review_id": review_id, "likes": review.likes, "dislikes": review.dislikes}
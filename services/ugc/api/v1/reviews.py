@@ -2,7 +2,7 @@ from datetime import datetime
 
 from dependencies.user import get_user_service
 from fastapi import APIRouter, Depends, HTTPException, Request
-from schemas.review import Review
+from schemas.review import Review, find_movie_reviews
 from services.user import UserService
 
 router = APIRouter()
@@ -36,7 +36,7 @@ async def get_movie_reviews(
     token = request.cookies.get("access_token_cookie")
     await user_service.get_user_id(token)
 
-    reviews = await Review.find(Review.movie_id == movie_id).to_list()
+    reviews = await find_movie_reviews(movie_id).to_list()
     return {"movie_id": movie_id, "reviews": reviews}
 
 
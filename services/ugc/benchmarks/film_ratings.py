@@ -0,0 +1,99 @@
+"""
+Задержка и память запроса средней оценки фильма: загрузка всех FilmRating в Python,
+агрегация $group на стороне MongoDB и чтение поддерживаемой сводки FilmRatingSummary.
+
+Бенчмарк пишет синтетические оценки в отдельную базу и удаляет её по окончании.
+Запуск из каталога сервиса при поднятом MongoDB:
+    python -m benchmarks.film_ratings
+    python -m benchmarks.film_ratings --ratings 1000000 --mongodb-url mongodb://localhost:27017
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import tracemalloc
+import uuid
+from typing import Awaitable, Callable, Tuple
+
+from beanie import init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+from schemas.film import FilmRating, FilmRatingSummary
+from services.film_rating import FilmRatingService
+
+RATINGS = 1_000_000
+OTHER_RATINGS = 100_000
+REPEATS = 3
+INSERT_CHUNK = 10_000
+
+
+async def load_ratings_stats(movie_id: str) -> Tuple[float, int]:
+    """Прежняя реализация: все оценки фильма превращаются в документы Beanie."""
+    stars = await FilmRating.find(FilmRating.movie_id == movie_id).to_list()
+    average_rating = sum(r.stars for r in stars) / len(stars) if stars else 0
+    return average_rating, len(stars)
+
+
+async def read_summary_stats(movie_id: str) -> Tuple[float, int]:
+    summary = await FilmRatingService().get_rating_summary(movie_id)
+    return summary.stars_sum / summary.ratings_count, summary.ratings_count
+
+
+async def fill_ratings(movie_id: str, ratings: int, other_ratings: int, seed: int):
+    rng = random.Random(seed)
+    collection = FilmRating.get_motor_collection()
+    movies = [movie_id] * ratings + [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(other_ratings)]
+    for start in range(0, len(movies), INSERT_CHUNK):
+        await collection.insert_many([
+            {"user_id": f"user-{start + i}", "movie_id": movie, "stars": rng.randint(0, 10)}
+            for i, movie in enumerate(movies[start:start + INSERT_CHUNK])
+        ])
+
+
+async def measure(name: str, get_stats: Callable[[str], Awaitable[Tuple[float, int]]], movie_id: str, repeats: int):
+    timings = []
+    peak_memory = 0
+    for _ in range(repeats):
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        average_rating, ratings_count = await get_stats(movie_id)
+        timings.append(time.perf_counter() - start_time)
+        peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    print(
+        f"{name:<12} avg={average_rating:.3f} count={ratings_count} "
+        f"median={statistics.median(timings) * 1000:>9.1f} ms  "
+        f"peak Python memory={peak_memory / 1024 / 1024:>8.1f} MiB"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ratings", type=int, default=RATINGS, help="Оценок у измеряемого фильма")
+    parser.add_argument("--other-ratings", type=int, default=OTHER_RATINGS, help="Оценок у прочих фильмов")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mongodb-url", default="mongodb://localhost:27017")
+    parser.add_argument("--database", default="ugc_benchmark")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(args.mongodb_url)
+    await client.drop_database(args.database)
+    await init_beanie(database=client[args.database], document_models=[FilmRating, FilmRatingSummary])
+    try:
+        movie_id = str(uuid.uuid4())
+        start_time = time.perf_counter()
+        await fill_ratings(movie_id, args.ratings, args.other_ratings, args.seed)
+        print(f"Inserted {args.ratings + args.other_ratings} ratings in {time.perf_counter() - start_time:.1f}s")
+        await FilmRatingService().rebuild_summaries()
+
+        await measure("to_list", load_ratings_stats, movie_id, args.repeats)
+        await measure("$group", FilmRatingService().aggregate_rating_stats, movie_id, args.repeats)
+        await measure("summary", read_summary_stats, movie_id, args.repeats)
+    finally:
+        await client.drop_database(args.database)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,153 @@
+"""
+Проверка планов запросов, которые выполняет API к MongoDB: ни один не должен
+читать коллекцию целиком (COLLSCAN).
+
+Скрипт создаёт отдельную базу с индексами из Settings документов, как это делает
+init_mongodb, заполняет её данными, выполняет explain для каждого запроса API и удаляет
+базу. Запросы строятся теми же функциями из schemas, что и в API, поэтому изменение
+запроса в API сразу попадает в проверку. Код возврата 1, если хотя бы один выигравший план содержит COLLSCAN.
+Запуск из каталога сервиса при поднятом MongoDB:
+    python -m benchmarks.query_plans
+    python -m benchmarks.query_plans --mongodb-url mongodb://localhost:27017
+"""
+import argparse
+import asyncio
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Tuple, Union
+
+from beanie import init_beanie
+from beanie.odm.queries.aggregation import AggregationQuery
+from beanie.odm.queries.find import FindMany, FindOne
+from db.mongodb import MongoDocuments
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from schemas.bookmark import Bookmark, find_user_bookmark, find_user_bookmarks
+from schemas.film import (FilmRating, FilmRatingSummary, find_movie_rating_summary, find_movie_ratings,
+                          find_user_rating)
+from schemas.review import Review, ReviewLike, find_movie_reviews, find_user_review_like
+from services.film_rating import RATING_STATS_PIPELINE
+
+USERS = 200
+MOVIES = 50
+
+USER_ID = "user-1"
+MOVIE_ID = "movie-1"
+REVIEW_ID = "000000000000000000000001"
+
+ApiQuery = Union[FindMany, FindOne, AggregationQuery]
+
+
+def get_api_queries() -> List[Tuple[str, ApiQuery]]:
+    """Запросы API с тестовыми значениями; строятся после init_beanie."""
+    return [
+        ("bookmarks: list by user", find_user_bookmarks(USER_ID)),
+        ("bookmarks: toggle", find_user_bookmark(USER_ID, MOVIE_ID)),
+        ("film_ratings: rate", find_user_rating(USER_ID, MOVIE_ID)),
+        ("film_ratings: summary", find_movie_rating_summary(MOVIE_ID)),
+        ("film_ratings: $group stats", find_movie_ratings(MOVIE_ID).aggregate(RATING_STATS_PIPELINE)),
+        ("reviews: list by movie", find_movie_reviews(MOVIE_ID)),
+        ("review_likes: like", find_user_review_like(USER_ID, REVIEW_ID)),
+    ]
+
+
+def get_explain_command(query: ApiQuery) -> Dict[str, Any]:
+    """Команда find или aggregate, которую Beanie отправит в MongoDB для запроса."""
+    collection = query.document_model.get_collection_name()
+    if isinstance(query, AggregationQuery):
+        return {"aggregate": collection, "pipeline": query.get_aggregation_pipeline(), "cursor": {}}
+    command: Dict[str, Any] = {"find": collection, "filter": query.get_filter_query()}
+    if isinstance(query, FindOne):
+        command["limit"] = 1
+        return command
+    if query.sort_expressions:
+        command["sort"] = {field: int(direction) for field, direction in query.sort_expressions}
+    if query.limit_number:
+        command["limit"] = query.limit_number
+    return command
+
+
+async def fill_collections(seed: int):
+    rng = random.Random(seed)
+    pairs = [(f"user-{user}", f"movie-{movie}") for user in range(USERS) for movie in range(MOVIES)]
+    rng.shuffle(pairs)
+    pairs = pairs[:len(pairs) // 2]
+    now = datetime.now()
+    await Bookmark.get_motor_collection().insert_many(
+        [{"user_id": user_id, "movie_id": movie_id} for user_id, movie_id in pairs]
+    )
+    await FilmRating.get_motor_collection().insert_many(
+        [{"user_id": user_id, "movie_id": movie_id, "stars": rng.randint(0, 10)} for user_id, movie_id in pairs]
+    )
+    await FilmRatingSummary.get_motor_collection().insert_many(
+        [{"movie_id": f"movie-{movie}", "stars_sum": 0, "ratings_count": 0, "histogram": {}} for movie in range(MOVIES)]
+    )
+    reviews = await Review.get_motor_collection().insert_many([
+        {
+            "author_id": user_id, "movie_id": movie_id, "text": "review",
+            "created_at": now - timedelta(minutes=index), "likes": 0, "dislikes": 0,
+        }
+        for index, (user_id, movie_id) in enumerate(pairs)
+    ])
+    await ReviewLike.get_motor_collection().insert_many([
+        {"user_id": f"user-{rng.randrange(USERS)}-{index}", "review_id": str(review_id), "is_liked": rng.random() < 0.8}
+        for index, review_id in enumerate(reviews.inserted_ids)
+    ])
+
+
+def iter_winning_stages(explain: Any, in_winning_plan: bool = False) -> Iterator[str]:
+    """Стадии выигравших планов из ответа explain любой вложенности (find и aggregate)."""
+    if isinstance(explain, dict):
+        if in_winning_plan and "stage" in explain:
+            yield explain["stage"]
+        for key, value in explain.items():
+            if key == "rejectedPlans":
+                continue
+            yield from iter_winning_stages(value, in_winning_plan or key in ("winningPlan", "queryPlan"))
+    elif isinstance(explain, list):
+        for value in explain:
+            yield from iter_winning_stages(value, in_winning_plan)
+
+
+async def explain_queries(database: AsyncIOMotorDatabase) -> List[str]:
+    explains = []
+    for name, query in get_api_queries():
+        explains.append((name, await database.command(
+            "explain", get_explain_command(query), verbosity="queryPlanner"
+        )))
+
+    collection_scans = []
+    for name, explain in explains:
+        stages = list(iter_winning_stages(explain))
+        print(f"{name:<28} {' <- '.join(stages)}")
+        if "COLLSCAN" in stages:
+            collection_scans.append(name)
+    return collection_scans
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongodb-url", default="mongodb://localhost:27017")
+    parser.add_argument("--database", default="ugc_query_plans")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(args.mongodb_url)
+    await client.drop_database(args.database)
+    try:
+        database = client[args.database]
+        await init_beanie(database=database, document_models=MongoDocuments)
+        await fill_collections(args.seed)
+        collection_scans = await explain_queries(database)
+    finally:
+        await client.drop_database(args.database)
+        client.close()
+
+    if collection_scans:
+        print(f"COLLSCAN in: {', '.join(collection_scans)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -23,11 +23,21 @@ class Settings(BaseSettings):
     mongodb_host: str = Field(..., alias='UGC_MONGODB_HOST')
     mongodb_port: int = Field(..., alias='UGC_MONGODB_PORT')
     hawk_integration_token: str = Field(..., alias='HAWK_INTEGRATION_TOKEN')
+    clickhouse_protocol: str = Field('http', alias='CLICKHOUSE_SERVICE_PROTOCOL')
+    clickhouse_host: str = Field('clickhouse', alias='CLICKHOUSE_SERVICE_HOST')
+    clickhouse_port: int = Field(8123, alias='CLICKHOUSE_SERVICE_PORT')
+    redis_host: str = Field('redis', alias='UGC_REDIS_HOST')
+    redis_port: int = Field(6379, alias='UGC_REDIS_PORT')
+    progress_cache_expire_seconds: int = Field(10, alias='UGC_PROGRESS_CACHE_EXPIRE_SECONDS')
 
     @property
     def mongodb_base_url(self):
         return f"mongodb://{self.mongodb_host}:{self.mongodb_port}"
 
+    @property
+    def clickhouse_url(self) -> str:
+        return f"{self.clickhouse_protocol}://{self.clickhouse_host}:{self.clickhouse_port}"
+
 
 settings = Settings()
 
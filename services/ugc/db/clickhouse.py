@@ -0,0 +1,19 @@
+from typing import Any, Dict, List, Optional
+
+from aiochclient import ChClient
+from utils.abstract import AsyncAnalyticDatabaseService
+
+
+class ClickHouseAdapter(AsyncAnalyticDatabaseService):
+    """Чтение аналитики из ClickHouse: агрегаты, которые собирает etl_ugc."""
+
+    def __init__(self, client: ChClient):
+        self.client = client
+
+    async def fetch(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        rows = await self.client.fetch(query, params=params)
+        return [dict(row) for row in rows]
+
+    async def fetchrow(self, query: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        row = await self.client.fetchrow(query, params=params)
+        return dict(row) if row is not None else None
@@ -1,12 +1,65 @@
-from beanie import init_beanie
+from typing import List, Type
+
+from beanie import Document, init_beanie
 from core.config import settings
 from db.mongodb import MongoDocuments
 from dependencies import mongodb
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import IndexModel
 from pymongo.errors import ConnectionFailure
+from schemas.film import FilmRating, FilmRatingSummary
+from schemas.review import Review, ReviewLike
+from services.film_rating import FilmRatingService
+from services.review import ReviewService
 from utils.logger import logger
 
 
+def get_unique_index_keys(model: Type[Document]) -> List[List[tuple]]:
+    indexes = getattr(getattr(model, "Settings", None), "indexes", [])
+    return [
+        list(index.document["key"].items())
+        for index in indexes
+        if isinstance(index, IndexModel) and index.document.get("unique")
+    ]
+
+
+async def remove_duplicates(database: AsyncIOMotorDatabase, model: Type[Document]) -> int:
+    """
+    Удаление дубликатов по ещё не построенным уникальным индексам документа: из документов
+    с одинаковым ключом остаётся созданный последним. Дубликаты могли появиться до уникальных
+    индексов, когда запись шла через find_one и create, а с ними построение индекса падает.
+
+    Returns:
+        Число удалённых документов.
+    """
+    LOGNAME = "MongoDB"
+
+    # До init_beanie имя коллекции не известно Beanie; без Settings.name это имя класса.
+    collection = database[getattr(model.Settings, "name", None) or model.__name__]
+    built_indexes = [
+        list(index["key"]) for index in (await collection.index_information()).values() if index.get("unique")
+    ]
+    removed = 0
+    for index_keys in get_unique_index_keys(model):
+        if index_keys in built_indexes:
+            continue
+        pipeline = [
+            {"$group": {"_id": {key: f"${key}" for key, _ in index_keys}, "ids": {"$push": "$_id"}}},
+            {"$match": {"ids.1": {"$exists": True}}},
+        ]
+        index_removed = 0
+        async for group in collection.aggregate(pipeline, allowDiskUse=True):
+            stale_ids = sorted(group["ids"])[:-1]
+            result = await collection.delete_many({"_id": {"$in": stale_ids}})
+            index_removed += result.deleted_count
+        if index_removed:
+            logger.warning(
+                f"[{LOGNAME}] Удалено {index_removed} дубликатов {model.__name__} по ключу {index_keys}"
+            )
+        removed += index_removed
+    return removed
+
+
 async def init_mongodb():
     LOGNAME = "MongoDB"
 
@@ -16,13 +69,31 @@ async def init_mongodb():
         await mongodb.mongodb.admin.command("ping")
         logger.info(f"[{LOGNAME}] MongoDB доступен.")
 
+        database = mongodb.mongodb[settings.mongodb_database_name]
+        removed = {model: await remove_duplicates(database, model) for model in MongoDocuments}
+
         logger.info(f"[{LOGNAME}] Инициализация Beanie...")
         await init_beanie(
-            database=mongodb.mongodb[settings.mongodb_database_name],
+            database=database,
             document_models=MongoDocuments
         )
         logger.info(f"[{LOGNAME}] Beanie успешно инициализирован.")
 
+        # Сводки оценок ведёт rate_film; оценки, поставленные до их появления, учитываются один раз,
+        # а после удаления дубликатов сводки пересчитываются по оставшимся оценкам.
+        if removed[FilmRating] or (
+            await FilmRatingSummary.find_one() is None and await FilmRating.find_one() is not None
+        ):
+            logger.info(f"[{LOGNAME}] Пересборка сводок оценок фильмов...")
+            await FilmRatingService().rebuild_summaries()
+            logger.info(f"[{LOGNAME}] Сводки оценок фильмов собраны.")
+
+        # Счётчики лайков ведёт like_review; у рецензий, созданных до их появления, они пересчитываются.
+        if removed[ReviewLike] or await Review.find_one({"likes": {"$exists": False}}) is not None:
+            logger.info(f"[{LOGNAME}] Пересчёт счётчиков лайков рецензий...")
+            await ReviewService().rebuild_like_counters()
+            logger.info(f"[{LOGNAME}] Счётчики лайков рецензий пересчитаны.")
+
     except ConnectionFailure as e:
         logger.error(f"[{LOGNAME}] Не удалось подключиться к MongoDB: {e}")
         raise
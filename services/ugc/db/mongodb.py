@@ -2,13 +2,14 @@ from typing import Any, Dict, List, Optional
 
 from motor.motor_asyncio import AsyncIOMotorClient
 from schemas.bookmark import Bookmark
-from schemas.film import FilmRating
+from schemas.film import FilmRating, FilmRatingSummary
 from schemas.review import Review, ReviewLike
 from utils.abstract import AsyncNoSQLDatabaseService
 
 MongoDocuments = [
     Bookmark,
     FilmRating,
+    FilmRatingSummary,
     Review,
     ReviewLike
 ]
@@ -0,0 +1,13 @@
+from redis.asyncio import Redis
+from utils.abstract import AsyncCacheStorage
+
+
+class RedisCacheAdapter(AsyncCacheStorage):
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    async def get(self, key: str):
+        return await self.redis.get(key)
+
+    async def set(self, key: str, value: str, expire: int):
+        await self.redis.set(key, value, expire)
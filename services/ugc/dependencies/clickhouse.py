@@ -0,0 +1,16 @@
+from aiochclient import ChClient
+from db.clickhouse import ClickHouseAdapter
+from fastapi import Depends
+from utils.abstract import AsyncAnalyticDatabaseService
+
+clickhouse_client: ChClient | None = None
+
+
+async def get_clickhouse_client() -> ChClient:
+    return clickhouse_client
+
+
+async def get_clickhouse_service(
+    client: ChClient = Depends(get_clickhouse_client),
+) -> AsyncAnalyticDatabaseService:
+    return ClickHouseAdapter(client)
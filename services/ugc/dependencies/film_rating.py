@@ -0,0 +1,5 @@
+from services.film_rating import FilmRatingService
+
+
+def get_film_rating_service() -> FilmRatingService:
+    return FilmRatingService()
@@ -0,0 +1,12 @@
+from dependencies.clickhouse import get_clickhouse_service
+from dependencies.redis import get_cache
+from fastapi import Depends
+from services.progress import ProgressService
+from utils.abstract import AsyncAnalyticDatabaseService, AsyncCacheStorage
+
+
+def get_progress_service(
+    cache: AsyncCacheStorage = Depends(get_cache),
+    clickhouse_service: AsyncAnalyticDatabaseService = Depends(get_clickhouse_service),
+) -> ProgressService:
+    return ProgressService(cache, clickhouse_service)
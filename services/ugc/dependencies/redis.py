@@ -0,0 +1,16 @@
+from db.redis import RedisCacheAdapter
+from fastapi import Depends
+from redis.asyncio import Redis
+from utils.abstract import AsyncCacheStorage
+
+redis_client: Redis | None = None
+
+
+async def get_redis_client() -> Redis:
+    return redis_client
+
+
+async def get_cache(
+    client: Redis = Depends(get_redis_client),
+) -> AsyncCacheStorage:
+    return RedisCacheAdapter(client)
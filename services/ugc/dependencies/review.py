@@ -0,0 +1,5 @@
+from services.review import ReviewService
+
+
+def get_review_service() -> ReviewService:
+    return ReviewService()
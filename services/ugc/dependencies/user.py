@@ -1,5 +1,13 @@
+from fastapi import HTTPException, Request, status
 from services.user import UserService
 
 
 def get_user_service() -> UserService:
     return UserService()
+
+
+async def get_current_user_id(request: Request, user_service: UserService) -> str:
+    user_id = await user_service.get_user_id_from_jwt(request)
+    if user_id is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or missing access token")
+    return user_id
@@ -3,15 +3,18 @@ from contextlib import asynccontextmanager
 from datetime import datetime
 
 import uvicorn
+from aiochclient import ChClient
+from aiohttp import ClientSession
 from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
-from api.v1 import bookmarks, film_ratings, producer, review_likes, reviews
+from api.v1 import analytics, bookmarks, film_ratings, producer, progress, review_likes, reviews
 from core.config import settings
 from core.logger import LOGGING
 from db.init_db import init_mongodb
-from dependencies import kafka
+from dependencies import clickhouse, kafka, redis
 from fastapi import FastAPI, Request, status
 from fastapi.responses import ORJSONResponse
 from hawkcatcher import Hawk
+from redis.asyncio import Redis
 from utils.logger import logger
 
 hawk = Hawk(settings.hawk_integration_token)
@@ -28,6 +31,10 @@ async def lifespan(_: FastAPI):
         bootstrap_servers=settings.kafka_bootstrap_servers
     )
 
+    clickhouse_session = ClientSession()
+    clickhouse.clickhouse_client = ChClient(clickhouse_session, url=settings.clickhouse_url)
+    redis.redis_client = Redis(host=settings.redis_host, port=settings.redis_port)
+
     await init_mongodb()
 
     await kafka.kafka_consumer.start()
@@ -35,6 +42,8 @@ async def lifespan(_: FastAPI):
     yield
     await kafka.kafka_producer.stop()
     await kafka.kafka_consumer.stop()
+    await clickhouse_session.close()
+    await redis.redis_client.close()
 
 app = FastAPI(
     title=settings.project_name,
@@ -80,6 +89,8 @@ app.include_router(reviews.router, prefix='/ugc/api/v1/reviews', tags=['reviews'
 app.include_router(review_likes.router, prefix='/ugc/api/v1/review_likes', tags=['review_likes'])
 app.include_router(film_ratings.router, prefix='/ugc/api/v1/film_ratings', tags=['film_ratings'])
 app.include_router(bookmarks.router, prefix='/ugc/api/v1/bookmarks', tags=['bookmarks'])
+app.include_router(analytics.router, prefix='/ugc/api/v1/analytics', tags=['analytics'])
+app.include_router(progress.router, prefix='/ugc/api/v1/progress', tags=['progress'])
 
 
 if __name__ == '__main__':
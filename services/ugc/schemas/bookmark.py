@@ -1,4 +1,6 @@
 from beanie import Document
+from beanie.odm.queries.find import FindMany, FindOne
+from pymongo import ASCENDING, IndexModel
 
 
 class Bookmark(Document):
@@ -7,3 +9,15 @@ class Bookmark(Document):
 
     class Settings:
         collection = "bookmarks"
+        indexes = [
+            IndexModel([("user_id", ASCENDING), ("movie_id", ASCENDING)], unique=True),
+        ]
+
+
+# Запросы API к закладкам; по ним же benchmarks.query_plans проверяет, что они идут по индексам.
+def find_user_bookmarks(user_id: str) -> FindMany[Bookmark]:
+    return Bookmark.find(Bookmark.user_id == user_id)
+
+
+def find_user_bookmark(user_id: str, movie_id: str) -> FindOne[Bookmark]:
+    return Bookmark.find_one(Bookmark.user_id == user_id, Bookmark.movie_id == movie_id)
@@ -1,4 +1,9 @@
-from beanie import Document
+from typing import Dict
+
+from beanie import Document, Indexed
+from beanie.odm.queries.find import FindMany, FindOne
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
 
 
 class FilmRating(Document):
@@ -8,3 +13,36 @@ class FilmRating(Document):
 
     class Settings:
         collection = "film_ratings"
+        indexes = [
+            IndexModel([("user_id", ASCENDING), ("movie_id", ASCENDING)], unique=True),
+            # Покрывающий индекс для $group по оценкам фильма.
+            IndexModel([("movie_id", ASCENDING), ("stars", ASCENDING)]),
+        ]
+
+
+class FilmRatingSummary(Document):
+    """
+    Сводка оценок фильма, которую поддерживает rate_film: сумма и число оценок
+    и гистограмма по числу звёзд (ключ - оценка от 0 до 10 строкой).
+    """
+
+    movie_id: Indexed(str, unique=True)
+    stars_sum: int = 0
+    ratings_count: int = 0
+    histogram: Dict[str, int] = Field(default_factory=dict)
+
+    class Settings:
+        collection = "film_rating_summaries"
+
+
+# Запросы API к оценкам и сводкам; по ним же benchmarks.query_plans проверяет, что они идут по индексам.
+def find_user_rating(user_id: str, movie_id: str) -> FindOne[FilmRating]:
+    return FilmRating.find_one(FilmRating.user_id == user_id, FilmRating.movie_id == movie_id)
+
+
+def find_movie_ratings(movie_id: str) -> FindMany[FilmRating]:
+    return FilmRating.find(FilmRating.movie_id == movie_id)
+
+
+def find_movie_rating_summary(movie_id: str) -> FindOne[FilmRatingSummary]:
+    return FilmRatingSummary.find_one(FilmRatingSummary.movie_id == movie_id)
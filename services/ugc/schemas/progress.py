@@ -0,0 +1,10 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class MovieProgress(BaseModel):
+    movie_id: str
+    progress: float
+    status: str
+    last_watched: datetime
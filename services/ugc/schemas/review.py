@@ -2,6 +2,8 @@ from datetime import datetime
 from typing import Optional
 
 from beanie import Document
+from beanie.odm.queries.find import FindMany, FindOne
+from pymongo import ASCENDING, DESCENDING, IndexModel
 
 
 class Review(Document):
@@ -10,9 +12,15 @@ class Review(Document):
     text: str
     created_at: datetime
     updated_at: Optional[datetime] = None
+    # Счётчики оценок рецензии, которые поддерживает like_review.
+    likes: int = 0
+    dislikes: int = 0
 
     class Settings:
         collection = "reviews"
+        indexes = [
+            IndexModel([("movie_id", ASCENDING), ("created_at", DESCENDING)]),
+        ]
 
 
 class ReviewLike(Document):
@@ -29,3 +37,15 @@ class ReviewLike(Document):
 
     class Settings:
         collection = "review_likes"
+        indexes = [
+            IndexModel([("user_id", ASCENDING), ("review_id", ASCENDING)], unique=True),
+        ]
+
+
+# Запросы API к рецензиям и их оценкам; по ним же benchmarks.query_plans проверяет, что они идут по индексам.
+def find_movie_reviews(movie_id: str) -> FindMany[Review]:
+    return Review.find(Review.movie_id == movie_id).sort(-Review.created_at)
+
+
+def find_user_review_like(user_id: str, review_id: str) -> FindOne[ReviewLike]:
+    return ReviewLike.find_one(ReviewLike.user_id == user_id, ReviewLike.review_id == review_id)
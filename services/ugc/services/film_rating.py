@@ -0,0 +1,69 @@
+from typing import Optional, Tuple
+
+from beanie.odm.operators.update.general import Inc
+from schemas.film import FilmRating, FilmRatingSummary, find_movie_rating_summary, find_movie_ratings
+
+# Среднее и число оценок считает MongoDB: в приложение приходит один документ,
+# а не все оценки фильма.
+RATING_STATS_PIPELINE = [
+    {"$group": {"_id": None, "average_rating": {"$avg": "$stars"}, "ratings_count": {"$sum": 1}}},
+]
+
+# Пересборка сводок по всем оценкам: счётчики по (фильм, оценка) сворачиваются в гистограмму
+# и записываются в коллекцию сводок поверх прежних значений (стадию $merge добавляет rebuild_summaries).
+REBUILD_SUMMARIES_PIPELINE = [
+    {"$group": {"_id": {"movie_id": "$movie_id", "stars": "$stars"}, "count": {"$sum": 1}}},
+    {"$group": {
+        "_id": "$_id.movie_id",
+        "stars_sum": {"$sum": {"$multiply": ["$_id.stars", "$count"]}},
+        "ratings_count": {"$sum": "$count"},
+        "histogram": {"$push": {"k": {"$toString": "$_id.stars"}, "v": "$count"}},
+    }},
+    {"$project": {
+        "_id": 0,
+        "movie_id": "$_id",
+        "stars_sum": 1,
+        "ratings_count": 1,
+        "histogram": {"$arrayToObject": "$histogram"},
+    }},
+]
+
+
+class FilmRatingService:
+    async def get_rating_summary(self, movie_id: str) -> Optional[FilmRatingSummary]:
+        """Сводка оценок фильма одним чтением документа по уникальному индексу movie_id."""
+        return await find_movie_rating_summary(movie_id)
+
+    async def aggregate_rating_stats(self, movie_id: str) -> Tuple[float, int]:
+        """Средняя оценка фильма и число оценок по самим оценкам; у фильма без оценок - (0, 0)."""
+        stats = await find_movie_ratings(movie_id).aggregate(RATING_STATS_PIPELINE).to_list()
+        if not stats:
+            return 0, 0
+        return stats[0]["average_rating"], stats[0]["ratings_count"]
+
+    async def add_rating(self, movie_id: str, stars: int):
+        """Учёт новой оценки атомарным $inc; сводка создаётся при первой оценке фильма."""
+        await find_movie_rating_summary(movie_id).update(
+            Inc({"stars_sum": stars, "ratings_count": 1, f"histogram.{stars}": 1}),
+            upsert=True
+        )
+
+    async def change_rating(self, movie_id: str, old_stars: int, new_stars: int):
+        """Перенос изменённой оценки в сводке: число оценок не меняется, сдвигаются сумма и гистограмма."""
+        if old_stars == new_stars:
+            return
+        await find_movie_rating_summary(movie_id).update(
+            Inc({"stars_sum": new_stars - old_stars, f"histogram.{old_stars}": -1, f"histogram.{new_stars}": 1}),
+            upsert=True
+        )
+
+    async def rebuild_summaries(self):
+        # Beanie называет коллекцию по Settings.name, а без него - по имени класса,
+        # поэтому цель $merge берётся у документа сводки, а не задаётся строкой.
+        merge = {"$merge": {
+            "into": FilmRatingSummary.get_collection_name(),
+            "on": "movie_id",
+            "whenMatched": "replace",
+            "whenNotMatched": "insert",
+        }}
+        await FilmRating.aggregate([*REBUILD_SUMMARIES_PIPELINE, merge]).to_list()
@@ -0,0 +1,67 @@
+from typing import Any, Dict, List, Optional
+
+import orjson
+from core.config import settings
+from schemas.progress import MovieProgress
+from utils.abstract import AsyncAnalyticDatabaseService, AsyncCacheStorage
+from utils.sql_queries import CONTINUE_WATCHING_QUERY, USER_MOVIE_PROGRESS_QUERY
+
+
+class ProgressService:
+    """
+    Позиции просмотра пользователя из ClickHouse. Ответы кэшируются в Redis на несколько
+    секунд: этого хватает, чтобы повторные запросы «продолжить просмотр» не доходили
+    до ClickHouse, а новая позиция появлялась в ответе не позже, чем её загрузит etl_ugc.
+    """
+
+    def __init__(self, cache: AsyncCacheStorage, clickhouse_service: AsyncAnalyticDatabaseService):
+        self.cache = cache
+        self.clickhouse_service = clickhouse_service
+
+    async def get_continue_watching(self, user_id: str, limit: int) -> List[MovieProgress]:
+        """Недосмотренные фильмы пользователя, начиная с последнего открытого."""
+        cache_key = f'progress:{user_id}:continue:{limit}'
+        movies = await self._progress_from_cache(cache_key)
+        if movies is None:
+            rows = await self.clickhouse_service.fetch(
+                CONTINUE_WATCHING_QUERY, params={"user_id": user_id, "limit": limit}
+            )
+            movies = [self._row_to_progress(row) for row in rows]
+            await self._put_progress_to_cache(cache_key, movies)
+        return movies
+
+    async def get_movie_progress(self, user_id: str, movie_id: str) -> Optional[MovieProgress]:
+        """Последняя позиция пользователя в фильме, с которой продолжается воспроизведение."""
+        cache_key = f'progress:{user_id}:{movie_id}'
+        movies = await self._progress_from_cache(cache_key)
+        if movies is None:
+            row = await self.clickhouse_service.fetchrow(
+                USER_MOVIE_PROGRESS_QUERY, params={"user_id": user_id, "movie_id": movie_id}
+            )
+            movies = [self._row_to_progress(row)] if row is not None else []
+            await self._put_progress_to_cache(cache_key, movies)
+        return movies[0] if movies else None
+
+    @staticmethod
+    def _row_to_progress(row: Dict[str, Any]) -> MovieProgress:
+        return MovieProgress(
+            movie_id=row["movie_id"],
+            progress=row["last_progress"],
+            status=row["last_status"],
+            last_watched=row["watched_at"],
+        )
+
+    async def _progress_from_cache(self, cache_key: str) -> Optional[List[MovieProgress]]:
+        data = await self.cache.get(cache_key)
+        if data is None:
+            return None
+        return [MovieProgress(**movie) for movie in orjson.loads(data)]
+
+    async def _put_progress_to_cache(self, cache_key: str, movies: List[MovieProgress]):
+        # Пустой ответ тоже кэшируется: у нового пользователя позиций нет, и каждый его
+        # запрос иначе уходил бы в ClickHouse.
+        await self.cache.set(
+            cache_key,
+            orjson.dumps([movie.model_dump() for movie in movies]),
+            settings.progress_cache_expire_seconds
+        )
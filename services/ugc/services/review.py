@@ -0,0 +1,51 @@
+from beanie import PydanticObjectId
+from beanie.odm.operators.update.general import Inc
+from schemas.review import Review, ReviewLike
+
+# Пересчёт счётчиков всех рецензий по ReviewLike: review_id хранится строкой и приводится
+# к ObjectId, оценки рецензий, которых уже нет, отбрасываются (стадию $merge добавляет
+# rebuild_like_counters).
+REBUILD_LIKE_COUNTERS_PIPELINE = [
+    {"$group": {
+        "_id": "$review_id",
+        "likes": {"$sum": {"$cond": ["$is_liked", 1, 0]}},
+        "dislikes": {"$sum": {"$cond": ["$is_liked", 0, 1]}},
+    }},
+    {"$project": {
+        "_id": {"$convert": {"input": "$_id", "to": "objectId", "onError": None, "onNull": None}},
+        "likes": 1,
+        "dislikes": 1,
+    }},
+    {"$match": {"_id": {"$ne": None}}},
+]
+
+
+def get_like_field(is_liked: bool) -> str:
+    return "likes" if is_liked else "dislikes"
+
+
+class ReviewService:
+    async def add_like(self, review_id: str, is_liked: bool):
+        """Учёт новой оценки рецензии атомарным $inc по счётчику в самой рецензии."""
+        await Review.find_one(Review.id == PydanticObjectId(review_id)).update(
+            Inc({get_like_field(is_liked): 1})
+        )
+
+    async def change_like(self, review_id: str, was_liked: bool, is_liked: bool):
+        """Перенос изменённой оценки из одного счётчика рецензии в другой."""
+        if was_liked == is_liked:
+            return
+        await Review.find_one(Review.id == PydanticObjectId(review_id)).update(
+            Inc({get_like_field(was_liked): -1, get_like_field(is_liked): 1})
+        )
+
+    async def rebuild_like_counters(self):
+        """Обнуление счётчиков у рецензий без них и пересчёт всех счётчиков по ReviewLike."""
+        await Review.find({"likes": {"$exists": False}}).update({"$set": {"likes": 0, "dislikes": 0}})
+        merge = {"$merge": {
+            "into": Review.get_collection_name(),
+            "on": "_id",
+            "whenMatched": "merge",
+            "whenNotMatched": "discard",
+        }}
+        await ReviewLike.aggregate([*REBUILD_LIKE_COUNTERS_PIPELINE, merge]).to_list()
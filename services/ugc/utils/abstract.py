@@ -12,6 +12,26 @@ class AsyncMessageBroker(ABC):
         """Читать сообщения из Kafka"""
 
 
+class AsyncCacheStorage(ABC):
+    @abstractmethod
+    async def get(self, key: str, **kwargs):
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: str, expire: int, **kwargs):
+        pass
+
+
+class AsyncAnalyticDatabaseService(ABC):
+    @abstractmethod
+    async def fetch(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    async def fetchrow(self, query: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        pass
+
+
 class AsyncNoSQLDatabaseService(ABC):
     @abstractmethod
     async def find_one(self, collection: str, query: Dict[str, Any]) -> Optional[Dict[str, Any]]:
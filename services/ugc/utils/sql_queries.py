@@ -0,0 +1,85 @@
+MOVIE_PROGRESS_STATS_QUERY = """
+    SELECT
+        uniqMerge(viewers) AS viewers,
+        uniqIfMerge(completed_viewers) AS completed_viewers,
+        avgMerge(avg_progress) AS average_progress
+    FROM default.movie_progress_by_movie
+    WHERE movie_id = {movie_id}
+"""
+
+TOP_COMPLETED_MOVIES_QUERY = """
+    SELECT
+        movie_id,
+        uniqIfMerge(completed_viewers) AS completed_viewers,
+        uniqMerge(viewers) AS viewers
+    FROM default.movie_progress_by_movie
+    GROUP BY movie_id
+    ORDER BY completed_viewers DESC
+    LIMIT {limit}
+"""
+
+DAILY_VIEWERS_QUERY = """
+    SELECT
+        day,
+        uniqMerge(viewers) AS active_viewers,
+        uniqIfMerge(completed_viewers) AS completed_viewers,
+        avgMerge(avg_progress) AS average_progress
+    FROM default.movie_progress_daily
+    WHERE day BETWEEN {date_from} AND {date_to}
+    GROUP BY day
+    ORDER BY day
+"""
+
+# Последняя позиция по каждому фильму пользователя без FINAL: строки movie_progress, ещё не
+# схлопнутые слиянием ReplacingMergeTree, сворачиваются argMax по last_watched. Фильтр по
+# user_id - префикс ключа сортировки, поэтому читаются только гранулы этого пользователя.
+CONTINUE_WATCHING_QUERY = """
+    SELECT
+        movie_id,
+        argMax(progress, last_watched) AS last_progress,
+        argMax(status, last_watched) AS last_status,
+        max(last_watched) AS watched_at
+    FROM default.movie_progress
+    WHERE user_id = {user_id}
+    GROUP BY movie_id
+    HAVING last_status = 'in_progress'
+    ORDER BY watched_at DESC
+    LIMIT {limit}
+"""
+
+USER_MOVIE_PROGRESS_QUERY = """
+    SELECT
+        movie_id,
+        argMax(progress, last_watched) AS last_progress,
+        argMax(status, last_watched) AS last_status,
+        max(last_watched) AS watched_at
+    FROM default.movie_progress
+    WHERE user_id = {user_id} AND movie_id = {movie_id}
+    GROUP BY movie_id
+"""
+
+TOP_SEARCH_QUERIES_HOURLY_QUERY = """
+    SELECT
+        query,
+        sum(searches) AS total_searches,
+        uniqMerge(users) AS unique_users
+    FROM default.search_queries_hourly
+    WHERE hour = {hour}
+    GROUP BY query
+    ORDER BY unique_users DESC, total_searches DESC
+    LIMIT {limit}
+"""
+
+# Дневной топ пересчитывает etl_ugc: читаются только строки последнего пересчёта дня, без FINAL.
+TOP_SEARCH_QUERIES_DAILY_QUERY = """
+    SELECT
+        query,
+        argMax(searches, rolled_up_at) AS total_searches,
+        argMax(users, rolled_up_at) AS unique_users
+    FROM default.search_queries_daily
+    WHERE day = {day}
+        AND rolled_up_at = (SELECT max(rolled_up_at) FROM default.search_queries_daily WHERE day = {day})
+    GROUP BY query
+    ORDER BY unique_users DESC, total_searches DESC
+    LIMIT {limit}
+"""